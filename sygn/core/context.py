@@ -15,6 +15,7 @@ class Context():
         self.animator = None
         self.photon_sources = []
         self.signal = None
+        self.signal_realizations = None
         self.templates = None
         self.extractions = []
         self.star = None  # Since there are star properties that need to be shared, even if there is no stellar leakage
@@ -5,7 +5,7 @@ from typing import Any
 import astropy.units
 import numpy as np
 from astropy import units as u
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from sygn.util.helpers import Coordinates
 from sygn.util.matrix import get_2d_rotation_matrix
@@ -27,28 +27,64 @@ class ArrayConfiguration(ABC, BaseModel):
     baseline_ratio: int
     baseline: Any = None
     type: Any = None
+    _static_collector_positions: Any = PrivateAttr(default=None)
+    _static_collector_positions_baseline: Any = PrivateAttr(default=None)
+
+    @abstractmethod
+    def _calculate_static_collector_positions(self) -> astropy.units.Quantity:
+        """Calculate and return the x- and y-coordinates of the collectors of the static, i.e. unmodulated, array.
+
+        :return: An array of shape (2, collectors) containing the coordinates
+        """
+        pass
 
     @abstractmethod
     def get_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
-        """Return an array containing the time-dependent x- and y-coordinates of the collectors.
+        """Return the time-dependent x- and y-coordinates of the collectors. If an array of times, e.g. the full time
+        range, is given, the trajectories for all times are returned at once.
 
-        :param time: Time variable in seconds
-        :return: An array containing the coordinates.
+        :param time: Time variable in seconds or array of times
+        :return: The coordinates, each of shape (collectors,) for a single time or (times, collectors) for an array of
+            times
         """
         pass
 
+    def _get_static_collector_positions(self) -> astropy.units.Quantity:
+        """Return the static collector positions. These are only recalculated if the value of the baseline has changed
+        since the last call. A copy of the baseline is kept, such that in-place edits of the baseline are detected, too.
+
+        :return: An array of shape (2, collectors) containing the coordinates
+        """
+        if (self._static_collector_positions is None
+                or not np.array_equal(self._static_collector_positions_baseline, self.baseline)):
+            self._static_collector_positions = self._calculate_static_collector_positions()
+            self._static_collector_positions_baseline = self.baseline.copy()
+        return self._static_collector_positions
+
+    def _get_rotated_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
+        """Return the collector positions of the static array rotated with the modulation period.
+
+        :param time: Time variable in seconds or array of times
+        :return: The coordinates, each of shape (collectors,) or (times, collectors)
+        """
+        rotation_matrix = get_2d_rotation_matrix(np.atleast_1d(time), self.modulation_period)
+        collector_positions = np.einsum('ijt, jk -> itk', rotation_matrix, self._get_static_collector_positions())
+        if np.ndim(time) == 0:
+            collector_positions = collector_positions[:, 0]
+        return Coordinates(collector_positions[0], collector_positions[1])
+
 
 class EmmaXCircularRotation(ArrayConfiguration):
     """Class representation of the Emma-X array configuration with circular rotation of the array.
     """
     type: Any = ArrayConfigurationEnum.EMMA_X_CIRCULAR_ROTATION
 
-    def get_collector_positions(self, times: np.ndarray) -> Coordinates:
-        rotation_matrix = get_2d_rotation_matrix(times, self.modulation_period)
-        emma_x_static = self.baseline / 2 * np.array(
+    def _calculate_static_collector_positions(self) -> astropy.units.Quantity:
+        return self.baseline / 2 * np.array(
             [[self.baseline_ratio, self.baseline_ratio, -self.baseline_ratio, -self.baseline_ratio], [1, -1, -1, 1]])
-        collector_positions = np.matmul(rotation_matrix, emma_x_static)
-        return Coordinates(collector_positions[0], collector_positions[1])
+
+    def get_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
+        return self._get_rotated_collector_positions(time)
 
 
 class EmmaXDoubleStretch(ArrayConfiguration):
@@ -56,12 +92,18 @@ class EmmaXDoubleStretch(ArrayConfiguration):
     """
     type: Any = ArrayConfigurationEnum.EMMA_X_DOUBLE_STRETCH
 
-    def get_collector_positions(self, time: float) -> Coordinates:
-        emma_x_static = self.baseline / 2 * np.array(
+    def _calculate_static_collector_positions(self) -> astropy.units.Quantity:
+        return self.baseline / 2 * np.array(
             [[self.baseline_ratio, self.baseline_ratio, -self.baseline_ratio, -self.baseline_ratio], [1, -1, -1, 1]])
+
+    def get_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
+        emma_x_static = self._get_static_collector_positions()
         # TODO: fix calculations
-        collector_positions = emma_x_static * (1 + (2 * self.baseline) / self.baseline * np.sin(
-            2 * np.pi * u.rad / self.modulation_period * time))
+        stretch_factor = (1 + (2 * self.baseline) / self.baseline * np.sin(
+            2 * np.pi * u.rad / self.modulation_period * np.atleast_1d(time)))
+        collector_positions = emma_x_static[:, None, :] * stretch_factor[None, :, None]
+        if np.ndim(time) == 0:
+            collector_positions = collector_positions[:, 0]
         return Coordinates(collector_positions[0], collector_positions[1])
 
 
@@ -70,16 +112,16 @@ class EquilateralTriangleCircularRotation(ArrayConfiguration):
     """
     type: Any = ArrayConfigurationEnum.EQUILATERAL_TRIANGLE_CIRCULAR_ROTATION
 
-    def get_collector_positions(self, time: float) -> Coordinates:
+    def _calculate_static_collector_positions(self) -> astropy.units.Quantity:
         height = np.sqrt(3) / 2 * self.baseline
         height_to_center = height / 3
-        rotation_matrix = get_2d_rotation_matrix(time, self.modulation_period)
-
-        equilateral_triangle_static = np.array(
+        return np.array(
             [[0, self.baseline.value / 2, -self.baseline.value / 2],
-             [height.value - height_to_center.value, -height_to_center.value, -height_to_center.value]])
-        collector_positions = np.matmul(rotation_matrix, equilateral_triangle_static) * self.baseline.unit
-        return Coordinates(collector_positions[0], collector_positions[1])
+             [height.value - height_to_center.value, -height_to_center.value,
+              -height_to_center.value]]) * self.baseline.unit
+
+    def get_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
+        return self._get_rotated_collector_positions(time)
 
 
 class RegularPentagonCircularRotation(ArrayConfiguration):
@@ -103,11 +145,9 @@ class RegularPentagonCircularRotation(ArrayConfiguration):
         """
         return 0.851 * self.baseline.value * np.sin(angle)
 
-    def get_collector_positions(self, time: float) -> Coordinates:
-        angles = [0, 2 * np.pi / 5, 4 * np.pi / 5, 6 * np.pi / 5, 8 * np.pi / 5]
-        rotation_matrix = get_2d_rotation_matrix(time, self.modulation_period)
-        pentagon_static = np.array([
-            [self._x(angles[0]), self._x(angles[1]), self._x(angles[2]), self._x(angles[3]), self._x(angles[4])],
-            [self._y(angles[0]), self._y(angles[1]), self._y(angles[2]), self._y(angles[3]), self._y(angles[4])]])
-        collector_positions = np.matmul(rotation_matrix, pentagon_static) * self.baseline.unit
-        return Coordinates(collector_positions[0], collector_positions[1])
+    def _calculate_static_collector_positions(self) -> astropy.units.Quantity:
+        angles = np.array([0, 2 * np.pi / 5, 4 * np.pi / 5, 6 * np.pi / 5, 8 * np.pi / 5])
+        return np.array([self._x(angles), self._y(angles)]) * self.baseline.unit
+
+    def get_collector_positions(self, time: astropy.units.Quantity) -> Coordinates:
+        return self._get_rotated_collector_positions(time)
@@ -2,6 +2,7 @@ from typing import Any
 
 import numpy as np
 from astropy import units as u
+from scipy.special import j0
 from tqdm import tqdm
 
 from sygn.core.context import Context
@@ -88,3 +89,38 @@ class Exozodi(PhotonSource):
 
     def get_sky_brightness_distribution(self, index_time: int, index_wavelength: int) -> np.ndarray:
         return self.sky_brightness_distribution[index_wavelength]
+
+    def get_visibilities(self, baselines: Coordinates, wavelengths: np.ndarray) -> np.ndarray:
+        """Return the visibilities of the exozodi. Since its sky brightness distribution is radially symmetric, the
+        visibilities only depend on the baseline lengths and are given by the Hankel transform of the radial profile,
+        i.e. by the sum over all rings of pixels with equal radii, weighted by the zeroth-order Bessel function. The
+        transform is only evaluated once per unique baseline length.
+
+        :param baselines: The x- and y-components of the baselines in units of meters, each of shape (times, inputs,
+            inputs)
+        :param wavelengths: The wavelengths in units of meters
+        :return: The visibilities of shape (times, wavelengths, inputs, inputs)
+        """
+        baseline_lengths, indices_baseline_lengths = np.unique(
+            np.round(np.sqrt(baselines.x ** 2 + baselines.y ** 2), 9),
+            return_inverse=True)
+
+        # The rings are identified in units of pixel pitches, which is the same for all wavelengths
+        pixel_pitches = np.array([(sky_coordinates.x[0, 1] - sky_coordinates.x[0, 0]).to(u.rad).value for
+                                  sky_coordinates in self.sky_coordinates])
+        ring_radii, indices_ring_radii = np.unique(
+            np.round(np.sqrt(self.sky_coordinates[0].x ** 2 + self.sky_coordinates[0].y ** 2).to(u.rad).value
+                     / pixel_pitches[0], 6),
+            return_inverse=True)
+
+        sky_brightness_distribution = self.sky_brightness_distribution.value.reshape(len(wavelengths), -1)
+        normalization = np.count_nonzero(sky_brightness_distribution > 0, axis=-1)
+        normalization[normalization == 0] = 1
+        ring_weights = np.array([np.bincount(indices_ring_radii.ravel(), weights=sky_brightness_distribution[index],
+                                             minlength=len(ring_radii)) for index in range(len(wavelengths))])
+        ring_weights /= normalization[:, None]
+
+        arguments = (2 * np.pi / wavelengths[:, None, None] * baseline_lengths[None, :, None]
+                     * ring_radii[None, None, :] * pixel_pitches[:, None, None])
+        visibilities = np.einsum('wlr, wr -> wl', j0(arguments), ring_weights)
+        return np.moveaxis(visibilities[:, indices_baseline_lengths.reshape(baselines.x.shape)], 0, 1)
@@ -80,3 +80,35 @@ class LocalZodi(PhotonSource):
 
     def get_sky_brightness_distribution(self, index_time: int, index_wavelength: int) -> np.ndarray:
         return self.sky_brightness_distribution[index_wavelength]
+
+    def _get_dirichlet_kernel(self, argument: np.ndarray, grid_size: int) -> np.ndarray:
+        """Return the Dirichlet kernel, i.e. the normalized sum of the phasors of grid_size equidistant pixels with a
+        phase difference of 2 * argument between neighbouring pixels.
+
+        :param argument: The argument
+        :param grid_size: The grid size
+        :return: The Dirichlet kernel
+        """
+        denominator = grid_size * np.sin(argument)
+        singular = np.abs(denominator) < 1e-12
+        return np.where(singular,
+                        np.cos(grid_size * argument) / np.cos(argument),
+                        np.sin(grid_size * argument) / np.where(singular, 1, denominator))
+
+    def get_visibilities(self, baselines: Coordinates, wavelengths: np.ndarray) -> np.ndarray:
+        """Return the visibilities of the local zodi. Since its sky brightness distribution is uniform over the field of
+        view, the visibilities are given analytically by the product of the Dirichlet kernels along the x- and
+        y-direction of the pixel grid.
+
+        :param baselines: The x- and y-components of the baselines in units of meters, each of shape (times, inputs,
+            inputs)
+        :param wavelengths: The wavelengths in units of meters
+        :return: The visibilities of shape (times, wavelengths, inputs, inputs)
+        """
+        grid_size = self.sky_coordinates[0].x.shape[0]
+        pixel_pitches = np.array([(sky_coordinates.x[0, 1] - sky_coordinates.x[0, 0]).to(u.rad).value for
+                                  sky_coordinates in self.sky_coordinates])
+        factors = (np.pi / wavelengths * pixel_pitches)[None, :, None, None]
+        return (self._get_dirichlet_kernel(factors * baselines.x[:, None, :, :], grid_size)
+                * self._get_dirichlet_kernel(factors * baselines.y[:, None, :, :], grid_size)
+                * self.mean_spectral_flux_density.value[None, :, None, None])
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 import numpy as np
 from pydantic import BaseModel
@@ -70,6 +70,20 @@ class PhotonSource(ABC, BaseModel):
         """
         pass
 
+    def get_visibilities(self, baselines: Coordinates, wavelengths: np.ndarray) -> Optional[np.ndarray]:
+        """Return the complex visibilities of the source at the given baselines for all wavelengths. The visibilities
+        are normalized such that the visibility at zero baseline corresponds to the mean of the non-zero pixels of the
+        sky brightness distribution, which makes them directly comparable to the photon counts calculated from the sky
+        brightness distribution. Sources that do not provide visibilities return None.
+
+        :param baselines: The x- and y-components of the baselines between all pairs of collectors in units of meters,
+            each of shape (times, inputs, inputs)
+        :param wavelengths: The wavelengths in units of meters
+        :return: The visibilities in units of the sky brightness distribution of shape (times, wavelengths, inputs,
+            inputs) or None
+        """
+        return None
+
     def setup(self, context: Context):
         """Set up the main properties of the photon source. Rather than calling this method on initialization of the
         class instance, it has to be called explicitly after initiating the photon source object. This ensures a
@@ -233,3 +233,19 @@ class Planet(PhotonSource):
         :return: The sky brightness distribution
         """
         return self.sky_brightness_distribution[index_time][index_wavelength]
+
+    def get_sky_position(self, index_time: int, index_wavelength: int) -> Tuple[Coordinates, astropy.units.Quantity]:
+        """Return the sky coordinates of the pixel of the sky brightness distribution that contains the planet and the
+        spectral flux density within that pixel. Since the planet is a point source, this is the only pixel with a non-
+        zero value and the intensity response only needs to be evaluated there.
+
+        :param index_time: The time index
+        :param index_wavelength: The wavelength index
+        :return: A tuple containing the sky coordinates and the spectral flux density of the planet pixel
+        """
+        sky_brightness_distribution = self.get_sky_brightness_distribution(index_time, index_wavelength)
+        index_y, index_x = np.unravel_index(np.argmax(sky_brightness_distribution.value),
+                                            sky_brightness_distribution.shape)
+        sky_coordinates = self.get_sky_coordinates(index_time, index_wavelength)
+        return (Coordinates(sky_coordinates.x[index_y, index_x], sky_coordinates.y[index_y, index_x]),
+                sky_brightness_distribution[index_y, index_x])
@@ -5,6 +5,7 @@ import numpy as np
 from astropy import units as u
 from pydantic import field_validator
 from pydantic_core.core_schema import ValidationInfo
+from scipy.special import j1
 
 from sygn.core.context import Context
 from sygn.core.entities.photon_sources.photon_source import PhotonSource
@@ -158,5 +159,20 @@ class Star(PhotonSource):
     def get_sky_coordinates(self, index_time: int, index_wavelength: int) -> Coordinates:
         return self.sky_coordinates
 
+    def get_visibilities(self, baselines: Coordinates, wavelengths: np.ndarray) -> np.ndarray:
+        """Return the visibilities of the star, which are given analytically by the visibility of a uniform disk.
+
+        :param baselines: The x- and y-components of the baselines in units of meters, each of shape (times, inputs,
+            inputs)
+        :param wavelengths: The wavelengths in units of meters
+        :return: The visibilities of shape (times, wavelengths, inputs, inputs)
+        """
+        argument = (2 * np.pi / wavelengths[None, :, None, None]
+                    * np.sqrt(baselines.x ** 2 + baselines.y ** 2)[:, None, :, :]
+                    * self.angular_radius.to(u.rad).value)
+        uniform_disk_visibilities = np.ones(argument.shape)
+        uniform_disk_visibilities[argument > 0] = 2 * j1(argument[argument > 0]) / argument[argument > 0]
+        return uniform_disk_visibilities * self.mean_spectral_flux_density.value[None, :, None, None]
+
     def get_sky_brightness_distribution(self, index_time: int, index_wavelength: int) -> np.ndarray:
         return self.sky_brightness_distribution[index_wavelength]
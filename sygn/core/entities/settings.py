@@ -13,6 +13,7 @@ class Settings(BaseModel):
     time_steps: int
     planet_orbital_motion: bool
     noise_contributions: Optional[NoiseContributions]
+    seed: Optional[int] = None
     integration_time: Any = None
     time_step: Any = None
 
@@ -1,7 +1,9 @@
 class Extraction():
-    def __init__(self, spectrum, spectrum_uncertainties, cost_function):
+    def __init__(self, spectrum, spectrum_uncertainties, cost_function, position=None, effective_area_rms=None):
         """Constructor method.
         """
         self.spectrum = spectrum
         self.spectrum_uncertainties = spectrum_uncertainties
         self.cost_function = cost_function
+        self.position = position
+        self.effective_area_rms = effective_area_rms
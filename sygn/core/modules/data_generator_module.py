@@ -19,12 +19,18 @@ class DataGeneratorModule(BaseModule):
     """Class representation of the data generator modules.
     """
 
-    def __init__(self):
+    def __init__(self, use_visibilities: bool = False, use_periodicity: bool = False):
         """Constructor method.
 
-        :param path_to_config_file: Path to the config file
+        :param use_visibilities: Whether the photon counts of extended sources should be calculated from their
+            visibilities. This approximates the sum over the pixels and its agreement depends on the grid, see
+            DataGenerator
+        :param use_periodicity: Whether only a single modulation period should be simulated and tiled over the time
+            range, if the signal is periodic
         """
         self.dependencies = [(ConfigLoaderModule, TargetLoaderModule)]
+        self._use_visibilities = use_visibilities
+        self._use_periodicity = use_periodicity
 
     def _create_animation(self, context: Context):
         """Prepare the animation writer and generate the data.
@@ -37,7 +43,8 @@ class DataGeneratorModule(BaseModule):
         with context.animator.writer.saving(context.animator.figure,
                                             f"animation_{context.animator.planet_name}_{np.round(context.animator.closest_wavelength.to(u.um).value, 3)}um_{datetime.now().strftime('%Y%m%d_%H%M%S.%f')}.gif",
                                             300):
-            data_generator = DataGenerator(context, GenerationMode.data)
+            data_generator = DataGenerator(context, GenerationMode.data, use_visibilities=self._use_visibilities,
+                                           use_periodicity=self._use_periodicity)
             return data_generator.generate_data()
 
     def apply(self, context: Context) -> Context:
@@ -55,6 +62,7 @@ class DataGeneratorModule(BaseModule):
         if context.animator:
             context.signal, _ = self._create_animation(context)
         else:
-            data_generator = DataGenerator(context, GenerationMode.data)
+            data_generator = DataGenerator(context, GenerationMode.data, use_visibilities=self._use_visibilities,
+                                           use_periodicity=self._use_periodicity)
             context.signal, _ = data_generator.generate_data()
         return context
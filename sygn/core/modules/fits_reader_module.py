@@ -9,7 +9,7 @@ from sygn.core.context import Context
 from sygn.core.modules.base_module import BaseModule
 from sygn.core.modules.config_loader_module import ConfigLoaderModule
 from sygn.core.modules.target_loader_module import TargetLoaderModule
-from sygn.core.template import Template
+from sygn.core.template import TemplateBank
 from sygn.io.fits_reader import FITSReader
 from sygn.util.helpers import FITSReadWriteType
 
@@ -41,9 +41,37 @@ class FITSReaderModule(BaseModule):
         context = TargetLoaderModule(path_to_context_file=None, config_dict=target_dict).apply(context)
         return context
 
+    def _read_template_files(self, context: Context) -> Context:
+        """Read the templates from a directory containing one FITS file per template.
+
+        :param context: The context object
+        :return: The context object
+        """
+        fits_files = glob.glob(f"{self._input_path}/*.fits")
+        signals = None
+
+        for fits_file in fits_files:
+            template_signal, template_fits_header, effective_area_rms = FITSReader.read_fits(fits_file, context)
+
+            # Check that template properties match data properties
+            FITSReader._check_template_fits_header(context, template_fits_header)
+
+            index_x, index_y = FITSReader._read_indices_from_fits_header(template_fits_header)
+
+            if signals is None:
+                signals = np.zeros((context.settings.grid_size, context.settings.grid_size) + template_signal.shape)
+                effective_areas_rms = np.zeros(signals.shape[:-1])
+            signals[index_x, index_y] = template_signal
+            effective_areas_rms[index_x, index_y] = effective_area_rms
+
+        if signals is not None:
+            context.templates = TemplateBank(signals, effective_areas_rms * u.m ** 2)
+        return context
+
     def apply(self, context: Context) -> Context:
         """Read the FITS file(s) and load the (template) signals. If the file corresponds to a synthetic measurement,
-        load the settings, mission, observatory and photon sources.
+        load the settings, mission, observatory and photon sources. Templates are read from a single template bank
+        file or from a directory containing one file per template.
 
         :param context: The context object of the pipeline
         :return: The (updated) context object
@@ -55,18 +83,15 @@ class FITSReaderModule(BaseModule):
             context = self._create_entities_from_fits_header(context, data_fits_header)
 
         elif self._data_type == FITSReadWriteType.Template:
-            context.templates = np.zeros((context.settings.grid_size, context.settings.grid_size), dtype=object)
-            fits_files = glob.glob(f"{self._input_path}/*.fits")
-
-            for fits_file in fits_files:
-                template_signal, template_fits_header, effective_area_rms = FITSReader.read_fits(fits_file, context)
+            # Directories containing one file per template are still supported
+            if Path(self._input_path).is_dir():
+                return self._read_template_files(context)
 
-                # Check that template properties match data properties
-                FITSReader._check_template_fits_header(context, template_fits_header)
+            template_bank, template_fits_header = FITSReader.read_template_bank(self._input_path)
 
-                index_x, index_y = FITSReader._read_indices_from_fits_header(template_fits_header)
+            # Check that template properties match data properties
+            FITSReader._check_template_fits_header(context, template_fits_header)
 
-                context.templates[index_x, index_y] = Template(template_signal, effective_area_rms * u.m ** 2, index_x,
-                                                               index_y)
+            context.templates = template_bank
 
         return context
@@ -33,7 +33,11 @@ class FluxCalibrationModule(BaseModule):
                 index_x, index_y = get_indices_of_maximum_of_2d_array(
                     extraction.cost_function[index_differential_output])
 
-                effective_area = context.templates[index_x, index_y].effective_area_rms
+                # If the extraction has been refined, the effective area at the refined position is used
+                if extraction.effective_area_rms is not None:
+                    effective_area = extraction.effective_area_rms[index_differential_output]
+                else:
+                    effective_area = context.templates.effective_areas_rms[index_x, index_y]
                 time_step = context.settings.time_step.to(u.s)
                 wavelength_bin_widths = context.observatory.instrument_parameters.wavelength_bin_widths
 
@@ -1,143 +1,544 @@
-from itertools import product
-from typing import Tuple
+from typing import Iterable, Tuple
 
 import numpy as np
 from astropy import units as u
 
 from sygn.core.context import Context
+from sygn.core.entities.photon_sources.planet import Planet
 from sygn.core.extraction import Extraction
 from sygn.core.modules.base_module import BaseModule
 from sygn.core.modules.data_generator_module import DataGeneratorModule
 from sygn.core.modules.fits_reader_module import FITSReaderModule
+from sygn.core.modules.polar_template_generator_module import PolarTemplateGeneratorModule
 from sygn.core.modules.template_generator_module import TemplateGeneratorModule
+from sygn.core.processing.data_generation import DataGenerator, GenerationMode
+from sygn.core.processing.running_statistics import RunningStatistics
+from sygn.core.template import CompressedTemplateBank, HarmonicTemplateBank, PolarTemplateBank, TemplateBank
 from sygn.util.grid import get_indices_of_maximum_of_2d_array
-from sygn.util.helpers import FITSReadWriteType
+from sygn.util.helpers import Coordinates, FITSReadWriteType
 
 
 class MLExtractionModule(BaseModule):
     """Class representation of the maximum likelihood extraction module.
     """
 
-    def __init__(self):
+    def __init__(self,
+                 number_of_peaks: int = None,
+                 refinement_factor: int = 4,
+                 significance_threshold: float = None,
+                 loop_gain: float = 1,
+                 maximum_number_of_iterations: int = 100,
+                 maximum_memory_size: int = None,
+                 number_of_bootstrap_samples: int = None):
         """Constructor method.
+
+        :param number_of_peaks: The number of peaks of the cost function around which the extraction is refined on a
+            finer grid of templates, which are generated on demand. If None, the extraction is not refined
+        :param refinement_factor: The number of fine grid steps per template grid step
+        :param significance_threshold: The significance down to which planets are extracted iteratively. If None, only
+            the maximum of the cost function of each differential output is extracted. The iterative extraction is
+            performed on the template grid and can not be combined with a refinement around the peaks
+        :param loop_gain: The fraction of the optimum flux that is subtracted per iteration of the iterative extraction
+        :param maximum_number_of_iterations: The maximum number of iterations of the iterative extraction
+        :param maximum_memory_size: The maximum number of bytes of template signals that are read and processed at
+            once. Template banks stored in the time domain, e.g. memory-mapped from a template bank file, are processed
+            in chunks of templates that do not exceed this size. If None, all templates are processed at once
+        :param number_of_bootstrap_samples: The number of bootstrap samples of the annulus positions used to estimate
+            the flux uncertainties. If None, the uncertainties are the standard deviations of the fluxes on the annulus
         """
         self.dependencies = [(FITSReaderModule, FITSReadWriteType.SyntheticMeasurement, FITSReadWriteType.Template),
                              (FITSReaderModule, DataGeneratorModule, FITSReadWriteType.Template),
                              (FITSReaderModule, TemplateGeneratorModule, FITSReadWriteType.SyntheticMeasurement),
-                             (DataGeneratorModule, TemplateGeneratorModule)]
+                             (FITSReaderModule, PolarTemplateGeneratorModule, FITSReadWriteType.SyntheticMeasurement),
+                             (DataGeneratorModule, TemplateGeneratorModule),
+                             (DataGeneratorModule, PolarTemplateGeneratorModule)]
+        if number_of_peaks and significance_threshold is not None:
+            raise ValueError('The refinement around the peaks can not be combined with the iterative extraction')
+        self._number_of_peaks = number_of_peaks
+        self._refinement_factor = refinement_factor
+        self._significance_threshold = significance_threshold
+        self._loop_gain = loop_gain
+        self._maximum_number_of_iterations = maximum_number_of_iterations
+        self._maximum_memory_size = maximum_memory_size
+        self._number_of_bootstrap_samples = number_of_bootstrap_samples
+        self._radial_pixel_indices = {}
 
     def _calculate_maximum_likelihood(self, signal, context) -> Tuple:
         """Calculate the maximum likelihood estimate for the flux in units of photons at the position of the maximum of
-        the cost function.
+        the cost function. Since the matrix B is diagonal, the cost function and the optimum flux are calculated for all
+        templates, differential outputs and wavelengths at once. If the templates are stored in the harmonic domain or
+        are compressed, the matrices B and C are calculated from the Fourier coefficients or the template coefficients,
+        respectively. For a polar template bank, the matrix C of all azimuths is calculated by a circular
+        cross-correlation along the time axis.
 
         :param signal: The signal
         :param context: The context object of the pipeline
         :return: The cost function and the optimum flux
         """
+        matrix_b, matrix_c = self._get_matrices_b_and_c(signal, context)
+        return self._get_cost_function_and_optimum_flux(matrix_b, matrix_c)
 
-        cost_function = np.zeros((context.observatory.beam_combination_scheme.number_of_differential_outputs,
-                                  context.settings.grid_size, context.settings.grid_size,
-                                  len(context.observatory.instrument_parameters.wavelength_bin_centers)))
-        optimum_flux = np.zeros(cost_function.shape)
-
-        for index_x, index_y in product(range(context.settings.grid_size), range(context.settings.grid_size)):
-
-            template = context.templates[index_x, index_y]
-
-            matrix_c = self._get_matrix_c(signal, template.signal)
-            matrix_b = self._get_matrix_b(signal, template.signal)
+    def _get_matrices_b_and_c(self, signal: np.ndarray, context: Context) -> Tuple:
+        """Return the diagonal elements of the matrix B and the matrix C of a signal for all templates, depending on how
+        the templates are stored.
 
-            for index_output in range(len(matrix_b)):
-                optimum_flux[index_output, index_x, index_y] = self._get_optimum_flux(matrix_b[index_output],
-                                                                                      matrix_c[index_output])
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param context: The context object of the pipeline
+        :return: The diagonal elements of the matrix B and the matrix C, each of shape (x, y, differential outputs,
+            wavelengths)
+        """
+        if isinstance(context.templates, PolarTemplateBank):
+            return (self._get_matrix_b_polar(signal, context.templates),
+                    self._get_matrix_c_polar(signal, context.templates))
+        if isinstance(context.templates, CompressedTemplateBank):
+            return (self._get_matrix_b_compressed(signal, context.templates),
+                    self._get_matrix_c_compressed(signal, context.templates))
+        if isinstance(context.templates, HarmonicTemplateBank):
+            return (self._get_matrix_b_harmonic(signal, context.templates),
+                    self._get_matrix_c_harmonic(signal, context.templates))
+
+        template_signals = context.templates.signals
+        template_signals = template_signals.reshape((-1,) + template_signals.shape[2:])
+        matrix_b = np.zeros(template_signals.shape[:-1])
+        matrix_c = np.zeros(template_signals.shape[:-1])
+
+        for template_chunk in self._get_template_chunks(template_signals):
+            template_signals_chunk = np.asarray(template_signals[template_chunk], dtype=float)
+            matrix_b[template_chunk] = self._get_matrix_b(signal, template_signals_chunk)
+            matrix_c[template_chunk] = self._get_matrix_c(signal, template_signals_chunk)
+        return (matrix_b.reshape(context.templates.shape + matrix_b.shape[1:]),
+                matrix_c.reshape(context.templates.shape + matrix_c.shape[1:]))
+
+    def _get_matrix_c_of_templates(self, signal: np.ndarray, context: Context, data_variance: np.ndarray) -> np.ndarray:
+        """Return the matrix C of a signal for all templates normalized by the given data variance, depending on how the
+        templates are stored.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param context: The context object of the pipeline
+        :param data_variance: The data variance of shape (differential outputs, wavelengths)
+        :return: The matrix C of shape (x, y, differential outputs, wavelengths)
+        """
+        if isinstance(context.templates, PolarTemplateBank):
+            return self._get_matrix_c_polar(signal, context.templates, data_variance)
+        if isinstance(context.templates, CompressedTemplateBank):
+            return self._get_matrix_c_compressed(signal, context.templates, data_variance)
+        if isinstance(context.templates, HarmonicTemplateBank):
+            return self._get_matrix_c_harmonic(signal, context.templates, data_variance)
+
+        template_signals = context.templates.signals
+        template_signals = template_signals.reshape((-1,) + template_signals.shape[2:])
+        matrix_c = np.zeros(template_signals.shape[:-1])
+        for template_chunk in self._get_template_chunks(template_signals):
+            matrix_c[template_chunk] = self._get_matrix_c(signal,
+                                                          np.asarray(template_signals[template_chunk], dtype=float),
+                                                          data_variance)
+        return matrix_c.reshape(context.templates.shape + matrix_c.shape[1:])
+
+    def _get_template_chunks(self, template_signals: np.ndarray) -> list:
+        """Return the slices of template indices that are processed at once, such that the template signals of a chunk
+        do not exceed the maximum memory size.
+
+        :param template_signals: The template signals of shape (templates, differential outputs, wavelengths, times)
+        :return: A list of slices of template indices
+        """
+        number_of_templates = len(template_signals)
+        if self._maximum_memory_size is None:
+            return [slice(0, number_of_templates)]
+        chunk_length = max(1, self._maximum_memory_size // (template_signals[0].size * np.dtype(float).itemsize))
+        return [slice(index_start, min(index_start + chunk_length, number_of_templates)) for index_start in
+                range(0, number_of_templates, chunk_length)]
+
+    def _calculate_maximum_likelihood_batch(self, signals: np.ndarray, context: Context) -> Tuple:
+        """Calculate the cost functions and the optimum fluxes for a stack of signals, e.g. many noise realizations of
+        the same target. For template banks stored in the time domain, the sums over time of the products of all signals
+        and all templates of a chunk are calculated by a single matrix-matrix product for each differential output and
+        wavelength, and the sums over time of the squared templates are shared by all signals. Only the cost functions
+        and the optimum fluxes of the chunks are kept.
+
+        :param signals: The signals of shape (signals, differential outputs, wavelengths, times)
+        :param context: The context object of the pipeline
+        :return: The cost functions of shape (signals, differential outputs, x, y) and the optimum fluxes of shape
+            (signals, differential outputs, x, y, wavelengths)
+        """
+        if isinstance(context.templates, (CompressedTemplateBank, HarmonicTemplateBank, PolarTemplateBank)):
+            cost_functions, optimum_fluxes = zip(*[self._calculate_maximum_likelihood(signal, context) for signal in
+                                                   signals])
+            return np.array(cost_functions), np.array(optimum_fluxes)
+
+        template_signals = context.templates.signals
+        template_signals = template_signals.reshape((-1,) + template_signals.shape[2:])
+        number_of_outputs, number_of_wavelengths = signals.shape[1:3]
+        data_variance = np.var(signals, axis=3)[:, None, None]
+        cost_functions = np.zeros((len(signals), number_of_outputs, len(template_signals), 1))
+        optimum_fluxes = np.zeros((len(signals), number_of_outputs, len(template_signals), 1, number_of_wavelengths))
+
+        for template_chunk in self._get_template_chunks(template_signals):
+            template_signals_chunk = np.asarray(template_signals[template_chunk], dtype=float)
+
+            # Calculate the products of shape (outputs, wavelengths, signals, templates) and reorder them to (signals,
+            # templates, 1, outputs, wavelengths), such that the templates of the chunk take the place of the grid axes
+            products = np.matmul(np.moveaxis(signals, 0, 2), np.moveaxis(template_signals_chunk, 0, 3))
+            products = np.moveaxis(products, (2, 3), (0, 1))[:, :, None]
+            template_energies = np.einsum('...ijk, ...ijk->...ij', template_signals_chunk, template_signals_chunk)
+
+            matrix_c = products / data_variance
+            matrix_b = template_energies[:, None] / data_variance
+            cost_functions[:, :, template_chunk], optimum_fluxes[:, :, template_chunk] = \
+                self._get_cost_function_and_optimum_flux(matrix_b, matrix_c)
+
+        grid_shape = context.templates.shape
+        return (cost_functions.reshape(cost_functions.shape[:2] + grid_shape),
+                optimum_fluxes.reshape(optimum_fluxes.shape[:2] + grid_shape + (number_of_wavelengths,)))
+
+    def _get_cost_function_and_optimum_flux(self, matrix_b: np.ndarray, matrix_c: np.ndarray) -> Tuple:
+        """Return the cost function and the optimum flux given the diagonal elements of the matrix B and the matrix C.
+
+        :param matrix_b: The diagonal elements of the matrix B of shape (..., x, y, differential outputs, wavelengths)
+        :param matrix_c: The matrix C of shape (..., x, y, differential outputs, wavelengths)
+        :return: The cost function of shape (..., differential outputs, x, y) and the optimum flux of shape (...,
+            differential outputs, x, y, wavelengths)
+        """
+        optimum_flux = self._get_optimum_flux(matrix_b, matrix_c)
+        optimum_flux = self._get_positivity_constraint(optimum_flux)
 
-                optimum_flux[index_output, index_x, index_y] = self._get_positivity_constraint(
-                    optimum_flux[index_output, index_x, index_y])
+        # Calculate the cost function according to equation B.8
+        cost_function = optimum_flux * matrix_c
 
-                # Calculate the cost function according to equation B.8
-                cost_function[index_output, index_x, index_y] = (optimum_flux[index_output, index_x, index_y] *
-                                                                 matrix_c[index_output])
+        # Move the differential outputs in front of the grid axes, i.e. (..., outputs, x, y, wavelengths)
+        cost_function = np.moveaxis(cost_function, -2, -4)
+        optimum_flux = np.moveaxis(optimum_flux, -2, -4)
 
         # Sum cost function over all wavelengths
-        cost_function = np.sum(cost_function, axis=3)
+        cost_function = np.sum(cost_function, axis=-1)
         cost_function[np.isnan(cost_function)] = 0
         return cost_function, optimum_flux
 
-    def _get_fluxes_uncertainties(self, cost_functions, cost_functions_white, optimum_fluxes_white,
-                                  context) -> np.ndarray:
-        """Return the uncertainties on the extracted fluxes by calculating the standard deviation of the extracted
-        fluxes at positions around the center at a radius of the maximum cost function.
+    def _get_peak_indices(self, cost_functions: np.ndarray) -> list:
+        """Return the indices of the highest peaks of the cost function summed over all differential outputs. Peaks are
+        required to be separated by more than one pixel, such that the refined regions around them do not overlap.
 
-        :param cost_functions: The cost functions
-        :param cost_functions_white: The whitened cost functions
-        :param optimum_fluxes_white: The whitened optimum fluxes
-        :param context: The context object of the pipeline
-        :return: The uncertainties on the extracted fluxes
+        :param cost_functions: The cost functions of shape (differential outputs, x, y)
+        :return: A list of tuples containing the x- and y-index of the peaks
         """
-        for index_output in range(len(cost_functions_white)):
-            # Get extracted flux at positions around center at radius of maximum cost function
-            height, width = cost_functions_white[index_output, :, :].shape
-            index_x, index_y = get_indices_of_maximum_of_2d_array(cost_functions[index_output])
+        cost_function = np.sum(cost_functions, axis=0)
+        peak_indices = []
 
-            # Create a boolean mask for the circle
-            center = (width // 2, height // 2)
-            radius = np.sqrt((index_x - width // 2) ** 2 + (index_y - width // 2) ** 2)
-            y, x = np.ogrid[:height, :width]
-            mask = ((x - center[0]) ** 2 + (y - center[1]) ** 2 <= radius ** 2 + 0.5) & \
-                   ((x - center[0]) ** 2 + (y - center[1]) ** 2 >= (radius - 1) ** 2 + 0.5)
+        for index in np.argsort(cost_function, axis=None)[::-1]:
+            index_x, index_y = np.unravel_index(index, cost_function.shape)
+            if all(max(abs(index_x - index_x_peak), abs(index_y - index_y_peak)) > 1 for index_x_peak, index_y_peak in
+                   peak_indices):
+                peak_indices.append((index_x, index_y))
+            if len(peak_indices) == self._number_of_peaks:
+                break
+        return peak_indices
 
-            # Extract the pixels within the circle
-            # circle_pixels = image[mask]
-            # print(mask.shape)
-            # print(extracted_photon_counts.shape)
-            # plt.imshow(cost_function_white[0, :, :] * mask)
-            # plt.colorbar()
-            # plt.show()
+    def _get_template_planet(self, context: Context) -> Planet:
+        """Return the planet whose sky coordinates define the grid of the templates.
 
-            a = np.einsum('ijk, ij -> ijk', optimum_fluxes_white[index_output, :, :], mask).reshape(
-                context.settings.grid_size ** 2, -1)
+        :param context: The context object of the pipeline
+        :return: The planet
+        """
+        planets = [source for source in context.photon_sources if isinstance(source, Planet)]
+        if not planets:
+            raise ValueError('The planet positions of the templates are only known if the planet is part of the photon '
+                             'sources')
 
-            uncertainties = np.zeros(a.shape[1], dtype=object)
+        # The templates are generated for the last planet, see TemplateGeneratorModule
+        return planets[-1]
 
-            for index in range(a.shape[1]):
-                uncertainties[index] = np.std(a[:, index])
+    def _get_template_sky_coordinates(self, context: Context) -> Coordinates:
+        """Return the sky coordinates of the template positions, i.e. the positions of the polar grid for a polar
+        template bank and the positions of the grid of the template planet otherwise.
 
-        return uncertainties
+        :param context: The context object of the pipeline
+        :return: The x- and y-sky coordinates, each of the shape of the grid of templates
+        """
+        if isinstance(context.templates, PolarTemplateBank):
+            return context.templates.get_sky_coordinates()
+        return self._get_template_planet(context).get_sky_coordinates(0, 0)
 
-    def _get_matrix_c(self, signal: np.ndarray, template_signal: np.ndarray) -> np.ndarray:
-        """Calculate the matrix C according to equation B.2.
+    def _get_positions_at_cost_function_maximum(self, cost_functions: np.ndarray, context: Context) -> np.ndarray:
+        """Return the sky coordinates of the template positions at the maximum of the cost function of each differential
+        output.
 
-        :param signal: The signal
-        :param template_signal: The template signal
-        :return: The matrix C
+        :param cost_functions: The cost functions of shape (differential outputs, x, y)
+        :param context: The context object of the pipeline
+        :return: The sky coordinates of shape (differential outputs, 2)
         """
-        data_variance = np.var(signal, axis=2)
-        return np.sum(signal * template_signal, axis=2) / data_variance
+        sky_coordinates = self._get_template_sky_coordinates(context)
+        return u.Quantity([u.Quantity([sky_coordinates.x[index_x, index_y], sky_coordinates.y[index_x, index_y]]) for
+                           index_x, index_y in map(get_indices_of_maximum_of_2d_array, cost_functions)])
 
-    def _get_matrix_b(self, signal: np.ndarray, template_signal: np.ndarray) -> np.ndarray:
-        """Calculate the matrix B according to equation B.3.
+    def _get_refined_extraction(self, signal, cost_functions, context) -> Tuple:
+        """Refine the extraction around the highest peaks of the cost function. For each peak, templates are generated
+        on a Cartesian grid that is finer than the grid of the planet by the refinement factor and covers the
+        neighbouring pixels of the peak. The flux is then extracted at the position of the maximum of the cost function
+        on the fine grids.
 
         :param signal: The signal
-        :param template_signal: The template signal
-        :return: The matrix B
+        :param cost_functions: The cost functions on the template grid
+        :param context: The context object of the pipeline
+        :return: A tuple containing the optimum flux, the effective areas RMS and the sky coordinates of the refined
+            positions for each differential output
         """
-        data_variance = np.var(signal, axis=2)
-        matrix_b_elements = np.sum(template_signal ** 2, axis=2) / data_variance
-        matrix_b = np.zeros(matrix_b_elements.shape[0], dtype=object)
+        planet = self._get_template_planet(context)
+        sky_coordinates_planet = planet.get_sky_coordinates(0, 0)
+        step_x = sky_coordinates_planet.x[0, 1] - sky_coordinates_planet.x[0, 0]
+        step_y = sky_coordinates_planet.y[1, 0] - sky_coordinates_planet.y[0, 0]
+        sky_coordinates = self._get_template_sky_coordinates(context)
+        offsets = np.arange(-self._refinement_factor, self._refinement_factor + 1) / self._refinement_factor
+        offsets_x, offsets_y = np.meshgrid(offsets, offsets)
+
+        peak_indices = self._get_peak_indices(cost_functions)
+        sky_coordinates_x = np.stack([sky_coordinates.x[index_x, index_y] + offsets_x.ravel() * step_x for
+                                      index_x, index_y in peak_indices])
+        sky_coordinates_y = np.stack([sky_coordinates.y[index_x, index_y] + offsets_y.ravel() * step_y for
+                                      index_x, index_y in peak_indices])
+
+        data_generator = DataGenerator(context, GenerationMode.template)
+        template_bank = TemplateBank.from_differential_photon_counts(
+            *data_generator.generate_templates_at_positions(planet, sky_coordinates_x, sky_coordinates_y))
+
+        matrix_c = self._get_matrix_c(signal, template_bank.signals)
+        optimum_flux = self._get_positivity_constraint(
+            self._get_optimum_flux(self._get_matrix_b(signal, template_bank.signals), matrix_c))
+        cost_function = np.sum(optimum_flux * matrix_c, axis=3)
+        cost_function[np.isnan(cost_function)] = 0
+
+        number_of_outputs = cost_function.shape[2]
+        optimum_flux_at_maximum = np.zeros(optimum_flux.shape[2:]) * u.ph
+        effective_area_rms = np.zeros(optimum_flux.shape[2:]) * template_bank.effective_areas_rms.unit
+        position = np.zeros((number_of_outputs, 2)) * sky_coordinates_x.unit
+
+        for index_output in range(number_of_outputs):
+            index_peak, index_position = get_indices_of_maximum_of_2d_array(cost_function[:, :, index_output])
+            optimum_flux_at_maximum[index_output] = optimum_flux[index_peak, index_position, index_output] * u.ph
+            effective_area_rms[index_output] = template_bank.effective_areas_rms[index_peak, index_position,
+                                                                                 index_output]
+            position[index_output] = u.Quantity([sky_coordinates_x[index_peak, index_position],
+                                                 sky_coordinates_y[index_peak, index_position]])
+
+        return optimum_flux_at_maximum, effective_area_rms, position
+
+    def _get_radial_pixel_indices(self, grid_shape: tuple) -> Tuple:
+        """Return the flattened indices of the pixels of a grid sorted by their squared distance to the center and the
+        sorted squared distances, such that the pixels of any annulus around the center form a contiguous range of the
+        sorted indices. The indices are calculated once per grid shape.
+
+        :param grid_shape: The shape of the grid
+        :return: A tuple containing the sorted flattened pixel indices and the sorted squared distances
+        """
+        if grid_shape not in self._radial_pixel_indices:
+            center = np.array(grid_shape) // 2
+            indices_x, indices_y = np.indices(grid_shape)
+            squared_distances = ((indices_x - center[0]) ** 2 + (indices_y - center[1]) ** 2).ravel()
+            indices_sorted = np.argsort(squared_distances, kind='stable')
+            self._radial_pixel_indices[grid_shape] = (indices_sorted, squared_distances[indices_sorted])
+        return self._radial_pixel_indices[grid_shape]
+
+    def _get_standard_deviations(self, fluxes: np.ndarray, is_valid: np.ndarray) -> np.ndarray:
+        """Return the standard deviations of fluxes along the pixel axis, where only the valid pixels are taken into
+        account.
+
+        :param fluxes: The fluxes of shape (..., differential outputs, pixels, wavelengths)
+        :param is_valid: Whether the pixels are valid of shape (..., differential outputs, pixels)
+        :return: The standard deviations of shape (..., differential outputs, wavelengths)
+        """
+        number_of_pixels = np.maximum(np.sum(is_valid, axis=-1), 1)[..., None]
+        is_valid = is_valid[..., None]
+        mean = np.sum(np.where(is_valid, fluxes, 0), axis=-2) / number_of_pixels
+        return np.sqrt(np.sum(np.where(is_valid, (fluxes - mean[..., None, :]) ** 2, 0), axis=-2) / number_of_pixels)
+
+    def _get_fluxes_uncertainties(self, cost_functions, cost_functions_white, optimum_fluxes_white,
+                                  context) -> np.ndarray:
+        """Return the uncertainties on the extracted fluxes by calculating the standard deviation of the whitened
+        extracted fluxes at positions on an annulus around the center at the radius of the maximum of the cost function
+        of each differential output. The annulus pixels of all differential outputs are gathered at once from the
+        radially sorted pixel indices. For a polar template bank, the annulus consists of all azimuths at the radius of
+        the maximum. If a number of bootstrap samples is given, the annulus positions are resampled
+        with replacement and the uncertainties are the mean standard deviations of all samples, which are calculated at
+        once.
+
+        :param cost_functions: The cost functions of shape (differential outputs, x, y)
+        :param cost_functions_white: The whitened cost functions of shape (differential outputs, x, y)
+        :param optimum_fluxes_white: The whitened optimum fluxes of shape (differential outputs, x, y, wavelengths)
+        :param context: The context object of the pipeline
+        :return: The uncertainties on the extracted fluxes of shape (differential outputs, wavelengths)
+        """
+        number_of_outputs = len(cost_functions_white)
+        grid_shape = cost_functions_white.shape[1:]
+        indices_maximum = np.array([get_indices_of_maximum_of_2d_array(cost_function) for cost_function in
+                                    cost_functions])
+
+        if isinstance(context.templates, PolarTemplateBank):
+            annulus_fluxes = optimum_fluxes_white[np.arange(number_of_outputs), indices_maximum[:, 0]]
+            number_of_pixels = np.full(number_of_outputs, grid_shape[1])
+            is_valid = np.ones(annulus_fluxes.shape[:2], dtype=bool)
+        else:
+            indices_sorted, squared_distances_sorted = self._get_radial_pixel_indices(grid_shape)
+
+            # Get the range of the sorted pixel indices on the annulus of width one pixel at the radius of the maximum
+            radii = np.sqrt(np.sum((indices_maximum - np.array(grid_shape) // 2) ** 2, axis=1))
+            indices_start = np.searchsorted(squared_distances_sorted, (radii - 1) ** 2 + 0.5, side='left')
+            indices_stop = np.searchsorted(squared_distances_sorted, radii ** 2 + 0.5, side='right')
+            number_of_pixels = np.maximum(indices_stop - indices_start, 0)
+
+            # Gather the fluxes of the annulus pixels of shape (outputs, pixels, wavelengths), padded to the largest
+            # annulus
+            indices_annulus = np.arange(max(1, number_of_pixels.max()))
+            is_valid = indices_annulus < number_of_pixels[:, None]
+            indices_pixel = indices_sorted[np.minimum(indices_start[:, None] + indices_annulus,
+                                                      len(indices_sorted) - 1)]
+            optimum_fluxes_white = optimum_fluxes_white.reshape((number_of_outputs, -1,
+                                                                 optimum_fluxes_white.shape[-1]))
+            annulus_fluxes = optimum_fluxes_white[np.arange(number_of_outputs)[:, None], indices_pixel]
+
+        if not self._number_of_bootstrap_samples:
+            return self._get_standard_deviations(annulus_fluxes, is_valid)
+
+        random_number_generator = np.random.default_rng(context.settings.seed)
+        indices_bootstrap = random_number_generator.integers(
+            0,
+            np.maximum(number_of_pixels, 1)[:, None],
+            size=(self._number_of_bootstrap_samples,) + is_valid.shape)
+        annulus_fluxes_bootstrap = annulus_fluxes[np.arange(number_of_outputs)[:, None], indices_bootstrap]
+        return np.mean(self._get_standard_deviations(annulus_fluxes_bootstrap, is_valid), axis=0)
+
+    def _get_matrix_c(self,
+                      signal: np.ndarray,
+                      template_signals: np.ndarray,
+                      data_variance: np.ndarray = None) -> np.ndarray:
+        """Calculate the matrix C according to equation B.2 for one or several templates at once.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_signals: The template signals of shape (..., differential outputs, wavelengths, times)
+        :param data_variance: The data variance of shape (differential outputs, wavelengths). If None, the variance of
+            the signal is used
+        :return: The matrix C of shape (..., differential outputs, wavelengths)
+        """
+        if data_variance is None:
+            data_variance = np.var(signal, axis=2)
+        return np.einsum('ijk, ...ijk->...ij', signal, template_signals) / data_variance
 
-        for index_output in range(len(matrix_b_elements)):
-            matrix_b[index_output] = np.diag(matrix_b_elements[index_output])
+    def _get_matrix_b(self, signal: np.ndarray, template_signals: np.ndarray) -> np.ndarray:
+        """Calculate the diagonal elements of the matrix B according to equation B.3 for one or several templates at
+        once. Since the matrix B is diagonal, only its diagonal elements are stored.
 
-        return matrix_b
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_signals: The template signals of shape (..., differential outputs, wavelengths, times)
+        :return: The diagonal elements of the matrix B of shape (..., differential outputs, wavelengths)
+        """
+        data_variance = np.var(signal, axis=2)
+        return np.einsum('...ijk, ...ijk->...ij', template_signals, template_signals) / data_variance
+
+    def _get_matrix_c_harmonic(self,
+                               signal: np.ndarray,
+                               template_bank: HarmonicTemplateBank,
+                               data_variance: np.ndarray = None) -> np.ndarray:
+        """Calculate the matrix C according to equation B.2 for all templates of a harmonic template bank. By Parseval's
+        theorem, the sum over time of the product of the signal and a template is given by the weighted sum over the
+        products of their Fourier coefficients, so the signal is transformed once and only the stored frequencies are
+        summed over.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The harmonic template bank
+        :param data_variance: The data variance of shape (differential outputs, wavelengths). If None, the variance of
+            the signal is used
+        :return: The matrix C of shape (x, y, differential outputs, wavelengths)
+        """
+        if data_variance is None:
+            data_variance = np.var(signal, axis=2)
+        signal_coefficients = np.fft.rfft(signal, axis=2)[..., template_bank.frequency_indices] * template_bank.weights
+        return (np.einsum('ijk, ...ijk->...ij', signal_coefficients, np.conj(template_bank.coefficients)).real
+                / template_bank.number_of_time_steps / data_variance)
+
+    def _get_matrix_b_harmonic(self, signal: np.ndarray, template_bank: HarmonicTemplateBank) -> np.ndarray:
+        """Calculate the diagonal elements of the matrix B according to equation B.3 for all templates of a harmonic
+        template bank using Parseval's theorem.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The harmonic template bank
+        :return: The diagonal elements of the matrix B of shape (x, y, differential outputs, wavelengths)
+        """
+        data_variance = np.var(signal, axis=2)
+        return (np.sum(abs(template_bank.coefficients) ** 2 * template_bank.weights, axis=-1)
+                / template_bank.number_of_time_steps / data_variance)
+
+    def _get_matrix_c_polar(self,
+                            signal: np.ndarray,
+                            template_bank: PolarTemplateBank,
+                            data_variance: np.ndarray = None) -> np.ndarray:
+        """Calculate the matrix C for all templates of a polar template bank. Since the templates at all azimuths are
+        delayed copies of the templates along the radial cut, the matrix C of all azimuths of a radius is the circular
+        cross-correlation of the signal and the template along the radial cut evaluated at the time shifts of the
+        azimuths, which is calculated by an inverse FFT of the cross-spectrum at the stored frequencies.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The polar template bank
+        :param data_variance: The data variance of shape (differential outputs, wavelengths). If None, the variance of
+            the signal is used
+        :return: The matrix C of shape (radii, azimuths, differential outputs, wavelengths)
+        """
+        if data_variance is None:
+            data_variance = np.var(signal, axis=2)
+        signal_coefficients = np.fft.rfft(signal, axis=-1)[..., template_bank.frequency_indices]
+        return template_bank.get_correlations(signal_coefficients) / data_variance
+
+    def _get_matrix_b_polar(self, signal: np.ndarray, template_bank: PolarTemplateBank) -> np.ndarray:
+        """Calculate the diagonal elements of the matrix B for all templates of a polar template bank from the energies
+        of the templates, which are given by the Fourier coefficients along the radial cut.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The polar template bank
+        :return: The diagonal elements of the matrix B of shape (radii, azimuths, differential outputs, wavelengths)
+        """
+        data_variance = np.var(signal, axis=2)
+        return template_bank.get_template_energies() / data_variance
+
+    def _get_matrix_c_compressed(self,
+                                 signal: np.ndarray,
+                                 template_bank: CompressedTemplateBank,
+                                 data_variance: np.ndarray = None) -> np.ndarray:
+        """Calculate the matrix C according to equation B.2 for all templates of a compressed template bank. The signal
+        is projected onto the basis signals once per wavelength, such that the matrix C of each template is given by the
+        product of its coefficients and the projections.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The compressed template bank
+        :param data_variance: The data variance of shape (differential outputs, wavelengths). If None, the variance of
+            the signal is used
+        :return: The matrix C of shape (x, y, differential outputs, wavelengths)
+        """
+        if data_variance is None:
+            data_variance = np.var(signal, axis=2)
+        projections = np.einsum('ijk, irjk->irj', signal, template_bank.basis)
+        matrix_c = np.einsum('...ir, irj->...ij', template_bank.coefficients, projections) / data_variance
+        return np.where(template_bank.undefined, np.nan, matrix_c)
+
+    def _get_matrix_b_compressed(self, signal: np.ndarray, template_bank: CompressedTemplateBank) -> np.ndarray:
+        """Calculate the diagonal elements of the matrix B according to equation B.3 for all templates of a compressed
+        template bank. The basis signals are only orthonormal over all wavelengths, so the overlaps of the basis signals
+        are calculated per wavelength.
+
+        :param signal: The signal of shape (differential outputs, wavelengths, times)
+        :param template_bank: The compressed template bank
+        :return: The diagonal elements of the matrix B of shape (x, y, differential outputs, wavelengths)
+        """
+        data_variance = np.var(signal, axis=2)
+        overlaps = np.einsum('irjk, isjk->irsj', template_bank.basis, template_bank.basis)
+        matrix_b = np.einsum('...ir, ...is, irsj->...ij', template_bank.coefficients, template_bank.coefficients,
+                             overlaps, optimize=True) / data_variance
+        return np.where(template_bank.undefined, np.nan, matrix_b)
 
     def _get_optimum_flux(self, matrix_b: np.ndarray, matrix_c: np.ndarray) -> np.ndarray:
-        """Calculate the optimum flux according to equation B.6.
+        """Calculate the optimum flux according to equation B.6. Since the matrix B is diagonal, its inverse is given by
+        the reciprocals of its diagonal elements.
 
-        :param matrix_b: The matrix B
+        :param matrix_b: The diagonal elements of the matrix B
         :param matrix_c: The matrix C
         :return: The optimum flux
         """
-        return np.diag(np.linalg.inv(matrix_b) * matrix_c)
+        return matrix_c / matrix_b
 
     def _get_optimum_flux_at_cost_function_maximum(self, cost_functions, optimum_fluxes, context) -> np.ndarray:
         """Calculate the optimum flux at the position of the maximum of the cost function.
@@ -166,7 +567,8 @@ class MLExtractionModule(BaseModule):
         return np.where(optimum_flux >= 0, optimum_flux, 0)
 
     def _get_whitened_signal(self, signal, optimum_fluxes, cost_functions, context) -> np.ndarray:
-        """Return the whitened signal, i.e. the original signal with the most likely planet signal substracted.
+        """Return the whitened signal, i.e. the original signal with the most likely planet signal substracted. For each
+        differential output, the template at the maximum of the cost function of that output is subtracted.
 
         :param signal: The signal
         :param optimum_fluxes: The optimum fluxes
@@ -174,13 +576,176 @@ class MLExtractionModule(BaseModule):
         :param context: The context object of the pipeline
         :return: The whitened signal
         """
+        signal_white = np.copy(signal)
         for index_output in range(context.observatory.beam_combination_scheme.number_of_differential_outputs):
             index_x, index_y = get_indices_of_maximum_of_2d_array(cost_functions[index_output])
-            signal_white = np.copy(context.signal)
-            signal_white -= np.einsum('ij, ijk->ijk', optimum_fluxes[:, index_x, index_y],
-                                      context.templates[index_x, index_y].signal)
+            signal_white[index_output] -= np.einsum('i, ij->ij', optimum_fluxes[index_output, index_x, index_y],
+                                                    context.templates[index_x, index_y].signal[index_output])
         return signal_white
 
+    def _extract_clean(self, signal: np.ndarray, context: Context) -> list:
+        """Extract the fluxes of several planets iteratively. In each iteration, the position of the maximum of the cost
+        function summed over all differential outputs is found and the template scaled by the loop gain times the
+        optimum flux is subtracted, until the significance of the maximum falls below the significance threshold. The
+        significance is the square root of the maximum of the cost function, which corresponds to the signal-to-noise
+        ratio of the detection for white noise. Since the matrix C is linear in the signal, it is updated by subtracting
+        the cross-correlations of the subtracted template with all templates, i.e. their sums over time of products
+        normalized by the data variance of the signal, which are calculated once per position and reused if the same
+        position is found again. Wavelengths at which the subtracted template is undefined are not updated.
+
+        :param signal: The signal
+        :param context: The context object of the pipeline
+        :return: A list containing one extraction per detected position, in the order of detection
+        """
+        matrix_b, matrix_c = self._get_matrices_b_and_c(signal, context)
+        data_variance = np.var(signal, axis=2)
+        sky_coordinates = self._get_template_sky_coordinates(context)
+        cross_correlations = {}
+        components = {}
+
+        for _ in range(self._maximum_number_of_iterations):
+            cost_functions, optimum_fluxes = self._get_cost_function_and_optimum_flux(matrix_b, matrix_c)
+            index_x, index_y = get_indices_of_maximum_of_2d_array(np.sum(cost_functions, axis=0))
+            if np.sqrt(np.sum(cost_functions[:, index_x, index_y])) < self._significance_threshold:
+                break
+
+            if (index_x, index_y) not in cross_correlations:
+                cross_correlations[index_x, index_y] = np.nan_to_num(self._get_matrix_c_of_templates(
+                    context.templates[index_x, index_y].signal,
+                    context,
+                    data_variance), nan=0)
+            if (index_x, index_y) not in components:
+                components[index_x, index_y] = (np.zeros((len(optimum_fluxes), optimum_fluxes.shape[-1])),
+                                                cost_functions)
+
+            flux = np.nan_to_num(self._loop_gain * optimum_fluxes[:, index_x, index_y], nan=0)
+            components[index_x, index_y][0][:] += flux
+            matrix_c = matrix_c - flux * cross_correlations[index_x, index_y]
+
+        # The uncertainties are estimated from the residual cost functions after all subtractions
+        cost_functions_residual, optimum_fluxes_residual = self._get_cost_function_and_optimum_flux(matrix_b, matrix_c)
+
+        extractions = []
+        for (index_x, index_y), (flux, cost_functions) in components.items():
+            number_of_outputs = len(flux)
+            position = np.tile(u.Quantity([sky_coordinates.x[index_x, index_y], sky_coordinates.y[index_x, index_y]]),
+                               (number_of_outputs, 1))
+            extractions.append(Extraction(flux * u.ph,
+                                          self._get_fluxes_uncertainties(cost_functions,
+                                                                         cost_functions_residual,
+                                                                         optimum_fluxes_residual,
+                                                                         context),
+                                          cost_functions,
+                                          position,
+                                          context.templates.effective_areas_rms[index_x, index_y]))
+        return extractions
+
+    def extract_batch(self, signals: np.ndarray, context: Context) -> list:
+        """Extract the flux from each signal of a stack of signals, e.g. many noise realizations of the same target.
+        The cost functions of all signals and of all whitened signals are calculated at once.
+
+        :param signals: The signals of shape (signals, differential outputs, wavelengths, times)
+        :param context: The context object of the pipeline
+        :return: A list containing one extraction per signal
+        """
+        cost_functions, optimum_fluxes = self._calculate_maximum_likelihood_batch(signals, context)
+
+        # Get the whitened signals and the uncertainties on the extracted fluxes
+        signals_white = np.array([self._get_whitened_signal(signal, optimum_flux, cost_function, context) for
+                                  signal, optimum_flux, cost_function in zip(signals, optimum_fluxes, cost_functions)])
+        cost_functions_white, optimum_fluxes_white = self._calculate_maximum_likelihood_batch(signals_white, context)
+
+        extractions = []
+        for index_signal, signal in enumerate(signals):
+            optimum_flux_at_maximum = self._get_optimum_flux_at_cost_function_maximum(cost_functions[index_signal],
+                                                                                      optimum_fluxes[index_signal],
+                                                                                      context)
+            optimum_fluxes_uncertainties = self._get_fluxes_uncertainties(cost_functions[index_signal],
+                                                                          cost_functions_white[index_signal],
+                                                                          optimum_fluxes_white[index_signal],
+                                                                          context)
+
+            # Refine the extracted flux on finer grids of templates around the highest peaks of the cost function
+            if self._number_of_peaks:
+                optimum_flux_at_maximum, effective_area_rms, position = self._get_refined_extraction(
+                    signal,
+                    cost_functions[index_signal],
+                    context)
+                extractions.append(Extraction(optimum_flux_at_maximum,
+                                              optimum_fluxes_uncertainties,
+                                              cost_functions[index_signal],
+                                              position,
+                                              effective_area_rms))
+                continue
+
+            # The positions of the templates of a polar template bank are not given by the grid of the planet
+            if isinstance(context.templates, PolarTemplateBank):
+                extractions.append(Extraction(optimum_flux_at_maximum,
+                                              optimum_fluxes_uncertainties,
+                                              cost_functions[index_signal],
+                                              self._get_positions_at_cost_function_maximum(cost_functions[index_signal],
+                                                                                           context)))
+                continue
+
+            extractions.append(Extraction(optimum_flux_at_maximum,
+                                          optimum_fluxes_uncertainties,
+                                          cost_functions[index_signal]))
+        return extractions
+
+    def extract_online(self,
+                       signal_chunks: Iterable[Tuple[slice, np.ndarray]],
+                       context: Context,
+                       detection_significance: float = None) -> Extraction:
+        """Extract the flux from a signal that arrives in time chunks, e.g. from DataGenerator.generate_data_chunks or
+        FITSReader.read_fits_chunks. Only the running sufficient statistics are kept instead of the full signal, such
+        that the memory does not depend on the integration time. If a detection significance is given, no further
+        chunks are consumed once the significance of the maximum of the cost function summed over all differential
+        outputs reaches it, which stops a streaming data generation early. Since the signal is not kept, the whitened
+        matrix C is obtained by subtracting the cross-correlations of the extracted templates over the observed times
+        and the data variance of the original signal is used for the uncertainties. The template signals are only
+        evaluated at the times of each chunk and in chunks of templates that do not exceed the maximum memory size, such
+        that harmonic, compressed and polar template banks are never expanded to the time domain as a whole. The
+        significance is only tested once the data variance is positive for all differential outputs and wavelengths.
+
+        :param signal_chunks: An iterable over tuples containing the slice of time indices and the signal chunk of
+            shape (differential outputs, wavelengths, times)
+        :param context: The context object of the pipeline
+        :param detection_significance: The significance at which the extraction is stopped. If None, all chunks are
+            consumed
+        :return: The extraction of the signal observed so far
+        """
+        running_statistics = RunningStatistics(context.templates, self._maximum_memory_size)
+
+        for time_chunk, signal_chunk in signal_chunks:
+            running_statistics.update(time_chunk, signal_chunk)
+            if detection_significance is not None and running_statistics.is_data_variance_positive:
+                cost_functions, _ = self._get_cost_function_and_optimum_flux(running_statistics.matrix_b,
+                                                                             running_statistics.matrix_c)
+                if np.sqrt(np.max(np.sum(cost_functions, axis=0))) >= detection_significance:
+                    break
+
+        matrix_b = running_statistics.matrix_b
+        cost_functions, optimum_fluxes = self._get_cost_function_and_optimum_flux(matrix_b,
+                                                                                  running_statistics.matrix_c)
+
+        matrix_c_white = running_statistics.matrix_c
+        for index_output in range(len(cost_functions)):
+            index_x, index_y = get_indices_of_maximum_of_2d_array(cost_functions[index_output])
+            flux = np.nan_to_num(optimum_fluxes[index_output, index_x, index_y], nan=0)
+            matrix_c_white[:, :, index_output] -= flux * running_statistics.get_cross_correlations(
+                context.templates[index_x, index_y].signal[index_output], index_output)
+        cost_functions_white, optimum_fluxes_white = self._get_cost_function_and_optimum_flux(matrix_b,
+                                                                                              matrix_c_white)
+
+        return Extraction(self._get_optimum_flux_at_cost_function_maximum(cost_functions, optimum_fluxes, context),
+                          self._get_fluxes_uncertainties(cost_functions,
+                                                         cost_functions_white,
+                                                         optimum_fluxes_white,
+                                                         context),
+                          cost_functions,
+                          (self._get_positions_at_cost_function_maximum(cost_functions, context) if
+                           isinstance(context.templates, PolarTemplateBank) else None))
+
     def apply(self, context: Context) -> Context:
         """Calculate the function for each template and then get a maximum likelihood estimate for the flux in units of
         photons at the position of the maximum of the cost function.
@@ -188,19 +753,9 @@ class MLExtractionModule(BaseModule):
         :param context: The context object of the pipeline
         :return: The (updated) context object
         """
-        cost_functions, optimum_fluxes = self._calculate_maximum_likelihood(context.signal, context)
-        optimum_flux_at_maximum = self._get_optimum_flux_at_cost_function_maximum(cost_functions,
-                                                                                  optimum_fluxes,
-                                                                                  context)
-
-        # Get the whitened signal and the uncertainties on the extracted flux
-        signal_white = self._get_whitened_signal(context.signal, optimum_fluxes, cost_functions, context)
-        cost_functions_white, optimum_fluxes_white = self._calculate_maximum_likelihood(signal_white, context)
-        optimum_fluxes_uncertainties = self._get_fluxes_uncertainties(cost_functions,
-                                                                      cost_functions_white,
-                                                                      optimum_fluxes_white,
-                                                                      context)
-
-        context.extractions.append(Extraction(optimum_flux_at_maximum, optimum_fluxes_uncertainties, cost_functions))
+        if self._significance_threshold is not None:
+            context.extractions.extend(self._extract_clean(context.signal, context))
+            return context
 
+        context.extractions.extend(self.extract_batch(context.signal[None], context))
         return context
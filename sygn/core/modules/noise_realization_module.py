@@ -0,0 +1,35 @@
+from sygn.core.context import Context
+from sygn.core.modules.base_module import BaseModule
+from sygn.core.modules.config_loader_module import ConfigLoaderModule
+from sygn.core.modules.target_loader_module import TargetLoaderModule
+from sygn.core.processing.data_generation import DataGenerator, GenerationMode
+
+
+class NoiseRealizationModule(BaseModule):
+    """Class representation of the noise realization module. It generates multiple independent noise realizations of
+    the same observation, which are drawn from a single calculation of the mean photon counts.
+    """
+
+    def __init__(self, number_of_realizations: int):
+        """Constructor method.
+
+        :param number_of_realizations: The number of noise realizations
+        """
+        self.dependencies = [(ConfigLoaderModule, TargetLoaderModule)]
+        self._number_of_realizations = number_of_realizations
+
+    def apply(self, context: Context) -> Context:
+        """Apply the module.
+
+        :param context: The context object of the pipeline
+        :return: The (updated) context object
+        """
+        context.observatory.set_optimal_baseline(context.star,
+                                                 context.mission.optimized_differential_output,
+                                                 context.mission.optimized_wavelength,
+                                                 context.mission.optimized_star_separation,
+                                                 context.mission.baseline_minimum,
+                                                 context.mission.baseline_maximum)
+        data_generator = DataGenerator(context, GenerationMode.data)
+        context.signal_realizations = data_generator.generate_data_realizations(self._number_of_realizations)
+        return context
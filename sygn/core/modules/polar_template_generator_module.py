@@ -0,0 +1,118 @@
+import numpy as np
+from astropy import units as u
+
+from sygn.core.context import Context
+from sygn.core.entities.photon_sources.planet import Planet
+from sygn.core.modules.base_module import BaseModule
+from sygn.core.modules.config_loader_module import ConfigLoaderModule
+from sygn.core.modules.fits_reader_module import FITSReaderModule
+from sygn.core.modules.target_loader_module import TargetLoaderModule
+from sygn.core.processing.data_generation import DataGenerator, GenerationMode
+from sygn.core.template import PolarTemplateBank
+from sygn.util.helpers import FITSReadWriteType
+
+
+class PolarTemplateGeneratorModule(BaseModule):
+    """Class representation of the polar template generator module. For circularly rotating arrays, the templates are
+    only calculated along a single radial cut and the templates at all other azimuths are synthesized by time shifts.
+    The templates are stored as a polar template bank with the layout (radius, azimuth), which can be used by the
+    maximum likelihood extraction instead of the templates on the Cartesian grid.
+    """
+
+    def __init__(self, number_of_azimuths: int = None, workers: int = 1, number_of_harmonics: int = None):
+        """Constructor method.
+
+        :param number_of_azimuths: The number of azimuths of the polar grid. If None, the number of time steps per
+            modulation period is used. Otherwise, the number of time steps per modulation period must be an integer
+            multiple of it, such that all azimuths correspond to exact time shifts by an integer number of time steps
+        :param workers: The number of worker processes the template calculation is distributed over
+        :param number_of_harmonics: The number of Fourier coefficients along the time axis that are stored per template.
+            If None, all coefficients are stored and the templates are exact
+        """
+        self.dependencies = [(ConfigLoaderModule, TargetLoaderModule),
+                             (ConfigLoaderModule, FITSReaderModule, FITSReadWriteType.SyntheticMeasurement),
+                             (TargetLoaderModule, FITSReaderModule, FITSReadWriteType.SyntheticMeasurement),
+                             (FITSReaderModule, FITSReadWriteType.SyntheticMeasurement)]
+        if number_of_azimuths is not None and number_of_azimuths < 1:
+            raise ValueError('The number of azimuths must be positive')
+        self._number_of_azimuths = number_of_azimuths
+        self._workers = workers
+        self._number_of_harmonics = number_of_harmonics
+
+    def _unload_noise_contributions(self, context) -> Context:
+        """Unload all noise contributions by setting the corresponding values to false, since they should not be
+        considered for creating the templates.
+
+        :param context: The context
+        :return: The context with the updated noise contributions
+        """
+        context.settings.noise_contributions.stellar_leakage = False
+        context.settings.noise_contributions.local_zodi_leakage = False
+        context.settings.noise_contributions.exozodi_leakage = False
+        context.settings.noise_contributions.fiber_injection_variability = False
+        context.settings.noise_contributions.optical_path_difference_variability.apply = False
+        return context
+
+    def _get_number_of_azimuths(self, context: Context) -> int:
+        """Return the number of azimuths of the polar grid. The templates at the azimuths are synthesized by time
+        shifts, which are only exact if they correspond to an integer number of time steps and if the time range covers
+        an integer number of modulation periods.
+
+        :param context: The context
+        :return: The number of azimuths
+        """
+        time_steps_per_period = (context.mission.modulation_period / context.settings.time_step).to(
+            u.dimensionless_unscaled).value
+        number_of_time_steps_per_period = int(np.round(time_steps_per_period))
+        if not np.isclose(time_steps_per_period, number_of_time_steps_per_period, rtol=1e-9, atol=0):
+            raise ValueError('Polar template generation requires the modulation period to be an integer multiple of '
+                             'the time step')
+
+        number_of_periods = len(context.time_range) / number_of_time_steps_per_period
+        if len(context.time_range) % number_of_time_steps_per_period != 0:
+            raise ValueError(f'Polar template generation requires an integer number of modulation periods, but the '
+                             f'time range covers {number_of_periods:.3f} periods')
+
+        number_of_azimuths = self._number_of_azimuths or number_of_time_steps_per_period
+        if number_of_time_steps_per_period % number_of_azimuths != 0:
+            raise ValueError(f'The number of time steps per modulation period ({number_of_time_steps_per_period}) is '
+                             f'not an integer multiple of the number of azimuths ({number_of_azimuths})')
+        return number_of_azimuths
+
+    def apply(self, context: Context) -> Context:
+        """Calculate the (spectral-temporal) templates for each planet on a polar grid of planet positions. The template
+        of the polar position (index_radius, index_azimuth) is stored with index_x = index_radius and index_y =
+        index_azimuth.
+
+        :param context: The context object of the pipeline
+        :return: The (updated) context object
+        """
+        number_of_azimuths = self._get_number_of_azimuths(context)
+        context.observatory.set_optimal_baseline(context.star,
+                                                 context.mission.optimized_differential_output,
+                                                 context.mission.optimized_wavelength,
+                                                 context.mission.optimized_star_separation,
+                                                 context.mission.baseline_minimum,
+                                                 context.mission.baseline_maximum)
+        context_template = self._unload_noise_contributions(context)
+
+        for source in context.photon_sources:
+            if isinstance(source, Planet):
+                if not context.settings.planet_orbital_motion:
+                    context_template.photon_sources = [source]
+                    data_generator = DataGenerator(context_template, GenerationMode.template)
+                    signals, effective_areas, radii, azimuths, time_shifts = \
+                        data_generator.generate_polar_template_bank(source, number_of_azimuths, self._workers)
+
+                    # Normalize each wavelength to unit RMS
+                    context.templates = PolarTemplateBank.from_differential_photon_counts(signals,
+                                                                                          effective_areas,
+                                                                                          radii,
+                                                                                          azimuths,
+                                                                                          time_shifts,
+                                                                                          self._number_of_harmonics)
+
+                else:
+                    raise Exception('Template generation including planet orbital motion is not yet supported')
+
+        return context
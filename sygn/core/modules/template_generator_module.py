@@ -1,5 +1,9 @@
+from pathlib import Path
+from typing import Tuple
+
+import astropy
 import numpy as np
-from tqdm.contrib.itertools import product
+from astropy import units as u
 
 from sygn.core.context import Context
 from sygn.core.entities.photon_sources.planet import Planet
@@ -8,7 +12,9 @@ from sygn.core.modules.config_loader_module import ConfigLoaderModule
 from sygn.core.modules.fits_reader_module import FITSReaderModule
 from sygn.core.modules.target_loader_module import TargetLoaderModule
 from sygn.core.processing.data_generation import DataGenerator, GenerationMode
-from sygn.core.template import Template
+from sygn.core.processing.simulation_plan import SimulationPlan
+from sygn.core.template import CompressedTemplateBank, HarmonicTemplateBank, TemplateBank
+from sygn.io.template_cache import TemplateCache
 from sygn.util.helpers import FITSReadWriteType
 
 
@@ -16,13 +22,35 @@ class TemplateGeneratorModule(BaseModule):
     """Class representation of the template generator module.
     """
 
-    def __init__(self):
+    def __init__(self,
+                 workers: int = 1,
+                 cache_directory: Path = None,
+                 maximum_cache_size: int = 2 ** 34,
+                 number_of_harmonics: int = None,
+                 compression_tolerance: float = None):
         """Constructor method.
+
+        :param workers: The number of worker processes the template calculation is distributed over
+        :param cache_directory: The directory of the template cache. If None, the templates are always calculated
+        :param maximum_cache_size: The maximum total size of the template cache in bytes
+        :param number_of_harmonics: The number of Fourier coefficients along the time axis that are stored per template.
+            If None, the templates are stored in the time domain
+        :param compression_tolerance: The maximum fraction of the energy of the template signals that is discarded when
+            compressing the templates by a truncated singular value decomposition. If None, the templates are not
+            compressed
         """
+        if number_of_harmonics and compression_tolerance is not None:
+            raise ValueError('Templates can either be stored in the harmonic domain or be compressed, but not both')
+        if compression_tolerance is not None and compression_tolerance < 0:
+            raise ValueError('The compression tolerance must not be negative')
         self.dependencies = [(ConfigLoaderModule, TargetLoaderModule),
                              (ConfigLoaderModule, FITSReaderModule, FITSReadWriteType.SyntheticMeasurement),
                              (TargetLoaderModule, FITSReaderModule, FITSReadWriteType.SyntheticMeasurement),
                              (FITSReaderModule, FITSReadWriteType.SyntheticMeasurement)]
+        self._workers = workers
+        self._number_of_harmonics = number_of_harmonics
+        self._compression_tolerance = compression_tolerance
+        self._template_cache = TemplateCache(cache_directory, maximum_cache_size) if cache_directory else None
 
     def _unload_noise_contributions(self, context) -> Context:
         """Unload all noise contributions by setting the corresponding values to false, since they should not be
@@ -38,6 +66,33 @@ class TemplateGeneratorModule(BaseModule):
         context.settings.noise_contributions.optical_path_difference_variability.apply = False
         return context
 
+    def _get_template_bank(self, context: Context, planet: Planet) -> Tuple[np.ndarray, astropy.units.Quantity]:
+        """Return the template bank of a planet. If a template cache is used, the template bank is loaded from the cache
+        if it has already been calculated for the same configuration, otherwise it is calculated and stored in the
+        cache.
+
+        :param context: The context with the unloaded noise contributions
+        :param planet: The planet
+        :return: A tuple containing the differential photon counts and the differential effective areas, each of shape
+            (grid size, grid size, differential outputs, wavelengths, times)
+        """
+        key = None
+        if self._template_cache:
+            sky_coordinates = planet.get_sky_coordinates(0, 0)
+            key = TemplateCache.get_key(SimulationPlan(context),
+                                        sky_coordinates.x.to(u.rad).value,
+                                        sky_coordinates.y.to(u.rad).value,
+                                        planet.mean_spectral_flux_density.value)
+            template_bank = self._template_cache.load(key)
+            if template_bank is not None:
+                return template_bank
+
+        data_generator = DataGenerator(context, GenerationMode.template)
+        template_bank = data_generator.generate_template_bank(planet, self._workers)
+        if self._template_cache:
+            self._template_cache.store(key, *template_bank)
+        return template_bank
+
     def apply(self, context: Context) -> Context:
         """Calculate the (spectral-temporal) templates for each planet and every possible planet position within the
         grid.
@@ -53,36 +108,21 @@ class TemplateGeneratorModule(BaseModule):
                                                  context.mission.baseline_maximum)
         context_template = self._unload_noise_contributions(context)
 
-        context.templates = np.zeros((context.settings.grid_size, context.settings.grid_size), dtype=object)
-
         for source in context.photon_sources:
             if isinstance(source, Planet):
                 if not context.settings.planet_orbital_motion:
-                    for index_x, index_y in product(range(context.settings.grid_size),
-                                                    range(context.settings.grid_size)):
-                        for index_wavelength in range(
-                                len(context.observatory.instrument_parameters.wavelength_bin_centers)):
-                            # Reset source sky distribution map
-                            source.sky_brightness_distribution[0][index_wavelength] *= 0
-
-                            # Set new planet position
-                            source.sky_brightness_distribution[0][index_wavelength][index_x][index_y] = \
-                                source.mean_spectral_flux_density[index_wavelength]
-
-                        # Run data generator
-                        context_template.photon_sources = [source]
-                        data_generator = DataGenerator(context_template, GenerationMode.template)
-                        signal, effective_area = data_generator.generate_data()
-                        units = effective_area.unit
-
-                        # Normalize each wavelength to unit RMS
-                        normalization = np.sqrt(np.mean(signal ** 2, axis=2))
-                        signal = np.einsum('ijk, ij->ijk', signal, 1 / normalization)
-
-                        # Create template objects
-                        template = Template(signal, np.sqrt(np.mean(np.array(effective_area) ** 2, axis=2)) * units,
-                                            index_x, index_y)
-                        context.templates[index_x, index_y] = template
+                    # Run data generator for all planet positions at once
+                    context_template.photon_sources = [source]
+                    signals, effective_areas = self._get_template_bank(context_template, source)
+
+                    # Normalize each wavelength to unit RMS
+                    context.templates = TemplateBank.from_differential_photon_counts(signals, effective_areas)
+                    if self._number_of_harmonics:
+                        context.templates = HarmonicTemplateBank.from_template_bank(context.templates,
+                                                                                    self._number_of_harmonics)
+                    if self._compression_tolerance is not None:
+                        context.templates = CompressedTemplateBank.from_template_bank(context.templates,
+                                                                                      self._compression_tolerance)
 
                 else:
                     raise Exception('Template generation including planet orbital motion is not yet supported')
@@ -9,6 +9,8 @@ from sygn.core.modules.config_loader_module import ConfigLoaderModule
 from sygn.core.modules.data_generator_module import DataGeneratorModule
 from sygn.core.modules.fits_reader_module import FITSReaderModule
 from sygn.core.modules.mlm_extraction_module import MLExtractionModule
+from sygn.core.modules.noise_realization_module import NoiseRealizationModule
+from sygn.core.modules.polar_template_generator_module import PolarTemplateGeneratorModule
 from sygn.core.modules.target_loader_module import TargetLoaderModule
 from sygn.core.modules.template_generator_module import TemplateGeneratorModule
 from sygn.util.grid import get_number_of_instances_in_list
@@ -76,7 +78,8 @@ class Pipeline():
         """Check that there is at most one module of each type in the pipeline.
         """
         for module_type in [ConfigLoaderModule, TargetLoaderModule, AnimatorModule, DataGeneratorModule,
-                            TemplateGeneratorModule, MLExtractionModule]:
+                            NoiseRealizationModule, TemplateGeneratorModule, PolarTemplateGeneratorModule,
+                            MLExtractionModule]:
             if not (get_number_of_instances_in_list(self._modules, module_type) <= 1):
                 raise TypeError(f'Can not have more than one {module_type.__name__} per pipeline')
 
@@ -95,6 +98,13 @@ class Pipeline():
         """
         return self._context.signal
 
+    def get_signal_realizations(self) -> np.ndarray:
+        """Return the noise realizations of the signal.
+
+        :return: An array containing the signal realizations
+        """
+        return self._context.signal_realizations
+
     def get_extractions(self) -> list[Extraction]:
         """Return the extractions.
 
@@ -1,15 +1,18 @@
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-from itertools import product
-from random import choice
-from typing import Tuple
+from typing import Iterator, Optional, Tuple
 
 import astropy
 import numpy as np
 from astropy import units as u
-from numpy.random import poisson, normal
 from tqdm import tqdm
 
 from sygn.core.context import Context
+from sygn.core.entities.observatory.array_configurations import EmmaXCircularRotation, \
+    EquilateralTriangleCircularRotation, RegularPentagonCircularRotation
+from sygn.core.entities.photon_sources.photon_source import PhotonSource
+from sygn.core.entities.photon_sources.planet import Planet
+from sygn.core.processing.simulation_plan import SimulationPlan
 from sygn.util.helpers import Coordinates
 
 
@@ -24,14 +27,32 @@ class DataGenerator():
     """Class representing the data generator.
     """
 
-    def __init__(self, context: Context, mode: GenerationMode):
+    def __init__(self,
+                 context: Context,
+                 mode: GenerationMode,
+                 maximum_chunk_size: int = 2 ** 22,
+                 use_visibilities: bool = False,
+                 use_periodicity: bool = False):
         """The constructor method.
 
         :param context: The context
         :param mode: The data generation mode
+        :param maximum_chunk_size: The maximum number of complex amplitudes that are calculated at once, i.e. the
+            maximum size of the (time, wavelength, input, pixel) tensors that are processed per chunk
+        :param use_visibilities: Whether the photon counts of extended sources that provide visibilities should be
+            calculated in the visibility domain rather than by summing the intensity responses over all pixels. Only
+            used in data mode. This is an approximation of the pixel sum, whose agreement depends on the grid. Compared
+            with the pixel sum for all four array configurations, relative deviations of up to 0.6 % have been found
+            for the star, of about 0.26 % for the exozodi and of the order of 1e-15 for the local zodi
+        :param use_periodicity: Whether only a single modulation period should be simulated and tiled over the time
+            range, if the signal is periodic
         """
         self._context = context
         self._mode = mode
+        self._maximum_chunk_size = maximum_chunk_size
+        self._use_visibilities = use_visibilities
+        self._use_periodicity = use_periodicity
+        self._random_number_generator = np.random.default_rng(self._context.settings.seed)
         self.differential_photon_counts = np.zeros(
             (self._context.observatory.beam_combination_scheme.number_of_differential_outputs,
              len(self._context.observatory.instrument_parameters.wavelength_bin_centers),
@@ -40,6 +61,23 @@ class DataGenerator():
             (self._context.observatory.beam_combination_scheme.number_of_differential_outputs,
              len(self._context.observatory.instrument_parameters.wavelength_bin_centers),
              len(self._context.time_range))) * u.m ** 2
+        self._differential_effective_area = np.zeros(self.differential_effective_area.shape)
+        self.mean_photon_counts_per_output = np.zeros(
+            (self._context.observatory.beam_combination_scheme.number_of_outputs,
+             len(self._context.observatory.instrument_parameters.wavelength_bin_centers),
+             len(self._context.time_range)))
+        self._draw_photon_noise = True
+
+    def __getstate__(self) -> dict:
+        """Return the state of the data generator that is pickled when it is sent to worker processes. The context is
+        excluded, since it may contain objects that can not be pickled, e.g. the animator, and all quantities required
+        by the workers are passed via the simulation plan.
+
+        :return: The state of the data generator
+        """
+        state = self.__dict__.copy()
+        state['_context'] = None
+        return state
 
     def _get_differential_photon_counts(self, photon_counts_per_output, differential_output_pair) -> np.ndarray:
         """Return the differential photon counts, given the photon counts per output and the pair of outputs.
@@ -62,262 +100,790 @@ class DataGenerator():
             return index_time
         return 0
 
+    def _get_number_of_time_steps_per_period(self, plan: SimulationPlan) -> Optional[int]:
+        """Return the number of time steps per modulation period, if the noiseless signal is periodic in the
+        modulation period and more than one period is observed. This is the case if the modulation period is an
+        integer multiple of the time step, the planets are static and no random perturbations are modeled. Otherwise,
+        return None.
+
+        :param plan: The simulation plan
+        :return: The number of time steps per modulation period or None
+        """
+        if (not self._use_periodicity
+                or plan.planet_orbital_motion
+                or self._context.animator
+                or plan.fiber_injection_variability
+                or plan.optical_path_difference_variability_apply):
+            return None
+
+        time_steps_per_period = plan.modulation_period / plan.time_step
+        number_of_time_steps_per_period = int(np.round(time_steps_per_period))
+        if (not np.isclose(time_steps_per_period, number_of_time_steps_per_period, rtol=1e-9, atol=0)
+                or number_of_time_steps_per_period >= len(plan.time_range)):
+            return None
+        return number_of_time_steps_per_period
+
+    def _get_time_chunks(self, number_of_time_steps: int, number_of_pixels: Optional[int] = None) -> list:
+        """Return the slices of time indices that are processed at once. The chunk length is chosen such that the
+        tensors of complex amplitudes and intensity responses do not exceed the maximum chunk size.
+
+        :param number_of_time_steps: The number of time steps that are simulated
+        :param number_of_pixels: The number of pixels that are evaluated per time step. If None, the maximum number of
+            pixels of all photon sources is used
+        :return: A list of slices of time indices
+        """
+        if number_of_pixels is None:
+            number_of_pixels = max(
+                [1 if self._use_point_source_path(source) else source.get_sky_coordinates(0, 0).x.size
+                 for source in self._context.photon_sources], default=1)
+        number_of_elements_per_time_step = (
+                len(self._context.observatory.instrument_parameters.wavelength_bin_centers)
+                * max(self._context.observatory.beam_combination_scheme.number_of_inputs,
+                      self._context.observatory.beam_combination_scheme.number_of_outputs)
+                * number_of_pixels)
+        chunk_length = max(1, self._maximum_chunk_size // number_of_elements_per_time_step)
+        return [slice(index_start, min(index_start + chunk_length, number_of_time_steps)) for index_start in
+                range(0, number_of_time_steps, chunk_length)]
+
+    def _get_source_indices_time(self, time_chunk: slice) -> list:
+        """Return the time indices that are used to get the sky coordinates and brightness distributions of the
+        sources within a time chunk. If the planet orbital motion is not considered, only the first time index is
+        returned and the sources are broadcast over the time axis.
+
+        :param time_chunk: The slice of time indices
+        :return: The list of time indices considering the planet orbital motion
+        """
+        if self._context.settings.planet_orbital_motion:
+            return list(range(time_chunk.start, time_chunk.stop))
+        return [self._get_index_planet_motion(time_chunk.start)]
+
+    def _use_point_source_path(self, source: PhotonSource) -> bool:
+        """Return whether the intensity response of a source only needs to be evaluated at a single pixel. This is the
+        case for planets, whose sky brightness distribution contains exactly one non-zero pixel, unless the full
+        intensity response map of the planet is required for the animation.
+
+        :param source: The photon source
+        :return: Whether to use the point source path
+        """
+        if not isinstance(source, Planet):
+            return False
+        return not (self._context.animator and source.name == self._context.animator.planet_name)
+
+    def _get_baselines(self, observatory_coordinates: Coordinates) -> Coordinates:
+        """Return the baselines between all pairs of collectors.
+
+        :param observatory_coordinates: The observatory coordinates in meters of shape (times, inputs)
+        :return: The x- and y-components of the baselines in meters, each of shape (times, inputs, inputs)
+        """
+        return Coordinates(observatory_coordinates.x[:, :, None] - observatory_coordinates.x[:, None, :],
+                           observatory_coordinates.y[:, :, None] - observatory_coordinates.y[:, None, :])
+
+    def _get_photon_counts_per_output_from_visibilities(self,
+                                                        wavelengths: np.ndarray,
+                                                        visibilities: np.ndarray,
+                                                        aperture_radius: float,
+                                                        beam_combination_matrix: np.ndarray,
+                                                        wavelength_bin_widths: np.ndarray,
+                                                        time_step: float,
+                                                        unperturbed_instrument_throughput: float,
+                                                        fiber_injection_variability: bool,
+                                                        optical_path_difference_variability_apply: bool,
+                                                        optical_path_difference_distribution: np.ndarray) -> np.ndarray:
+        """Return the mean photon counts per output for all times and wavelengths at once from the source visibilities.
+        The photon counts are given by the quadratic form M V M^H of the (perturbed) beam combination matrix M and the
+        visibility matrix V, which does not require a sum over the pixels.
+
+        :param wavelengths: The wavelengths in units of meters
+        :param visibilities: The visibilities in units of ph / (m^2 s um) of shape (times, wavelengths, inputs, inputs)
+        :param aperture_radius: The aperture radius in meters
+        :param beam_combination_matrix: The beam combination transfer matrix
+        :param wavelength_bin_widths: The wavelength bin widths in units of um
+        :param time_step: The time step in units of s
+        :param unperturbed_instrument_throughput: The unperturbed instrument throughput
+        :param fiber_injection_variability: Whether fiber injection variability should be modeled
+        :param optical_path_difference_variability_apply: Whether optical path difference variability should be modeled
+        :param optical_path_difference_distribution: The distribution to sample the OPD in units of meters
+        :return: The mean photon counts of shape (times, wavelengths, outputs)
+        """
+        beam_combination_matrices = np.broadcast_to(beam_combination_matrix,
+                                                    visibilities.shape[:2] + beam_combination_matrix.shape)
+
+        if fiber_injection_variability or optical_path_difference_variability_apply:
+            perturbations = self._get_perturbations(
+                wavelengths=wavelengths,
+                fiber_injection_variability=fiber_injection_variability,
+                optical_path_difference_variability_apply=optical_path_difference_variability_apply,
+                optical_path_difference_distribution=optical_path_difference_distribution,
+                number_of_time_steps=visibilities.shape[0],
+                number_of_inputs=visibilities.shape[2])
+            beam_combination_matrices = beam_combination_matrices * perturbations[:, :, None, :]
+
+        return (aperture_radius ** 2
+                * np.einsum('twoj, twjk, twok -> two',
+                            beam_combination_matrices,
+                            visibilities,
+                            beam_combination_matrices.conj()).real
+                * time_step
+                * wavelength_bin_widths[None, :, None]
+                * unperturbed_instrument_throughput)
+
+    def _get_separable_sky_coordinates(self,
+                                       source_sky_coordinates: Coordinates) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return the one-dimensional x- and y-sky coordinates of a regular grid as created by the meshgrid, i.e. if the
+        x-coordinates only vary along the columns and the y-coordinates only vary along the rows. Otherwise, return
+        None.
+
+        :param source_sky_coordinates: The source sky coordinates in radians of shape (times, wavelengths, pixels)
+        :return: A tuple containing the x- and y-sky coordinates, each of shape (times, wavelengths, grid size), or None
+        """
+        number_of_pixels = source_sky_coordinates.x.shape[-1]
+        grid_size = int(np.round(np.sqrt(number_of_pixels)))
+        if number_of_pixels < 4 or grid_size ** 2 != number_of_pixels:
+            return None
+
+        grid_shape = (grid_size, grid_size)
+        sky_coordinates_x = source_sky_coordinates.x.reshape(source_sky_coordinates.x.shape[:2] + grid_shape)
+        sky_coordinates_y = source_sky_coordinates.y.reshape(source_sky_coordinates.y.shape[:2] + grid_shape)
+        if (np.array_equal(sky_coordinates_x, np.broadcast_to(sky_coordinates_x[..., :1, :], sky_coordinates_x.shape))
+                and np.array_equal(sky_coordinates_y,
+                                   np.broadcast_to(sky_coordinates_y[..., :, :1], sky_coordinates_y.shape))):
+            return sky_coordinates_x[..., 0, :], sky_coordinates_y[..., :, 0]
+        return None
+
     def _get_input_complex_amplitudes(self,
-                                      time: astropy.units.Quantity,
-                                      wavelength: astropy.units.Quantity,
+                                      wavelengths: np.ndarray,
                                       source_sky_coordinates: Coordinates,
                                       observatory_coordinates: Coordinates,
-                                      aperture_radius: astropy.units.Quantity,
-                                      number_of_inputs: int,
-                                      grid_size: int) -> np.ndarray:
-        """Return the input complex amplitude vector, consisting of a flat wavefront per collector.
-
-        :param time: The time for which the intensity response is calculated
-        :param wavelength: The wavelength for which the intensity response is calculated
-        :param source_sky_coordinates: The sky coordinates of the source for which the intensity response is calculated
-        :param observatory_coordinates: The observatory coordinates at the time
-        :param aperture_radius: The aperture radius of the collectors
-        :param number_of_inputs: The number of inputs, i.e. collectors
-        :param grid_size: The grid size for the calculations
-        :return: The input complex amplitude vector
+                                      aperture_radius: float) -> np.ndarray:
+        """Return the input complex amplitudes, consisting of a flat wavefront per collector, for all times,
+        wavelengths and pixels at once.
+
+        :param wavelengths: The wavelengths in units of meters
+        :param source_sky_coordinates: The source sky coordinates in radians of shape (times, wavelengths, pixels)
+        :param observatory_coordinates: The observatory coordinates in meters of shape (times, inputs)
+        :param aperture_radius: The aperture radius of the collectors in meters
+        :return: The input complex amplitudes of shape (times, wavelengths, inputs, pixels)
         """
-        input_complex_amplitudes = np.zeros((number_of_inputs, grid_size, grid_size), dtype=complex) * u.m
-
-        for index_input in range(number_of_inputs):
-            input_complex_amplitudes[index_input] = aperture_radius.to(u.m) * np.exp(1j * 2 * np.pi / wavelength * (
-                    observatory_coordinates.x[index_input] * source_sky_coordinates.x.to(u.rad).value +
-                    observatory_coordinates.y[index_input] * source_sky_coordinates.y.to(u.rad).value))
-        return input_complex_amplitudes
+        wave_number = 2 * np.pi / wavelengths[None, :, None, None]
+        separable_sky_coordinates = self._get_separable_sky_coordinates(source_sky_coordinates)
+
+        # On a regular grid, the phasor factors into the outer product of the phasors along the rows and columns
+        if separable_sky_coordinates is not None:
+            sky_coordinates_x, sky_coordinates_y = separable_sky_coordinates
+            phasors_x = np.exp(
+                1j * wave_number * observatory_coordinates.x[:, None, :, None] * sky_coordinates_x[:, :, None, :])
+            phasors_y = np.exp(
+                1j * wave_number * observatory_coordinates.y[:, None, :, None] * sky_coordinates_y[:, :, None, :])
+            return (aperture_radius * phasors_y[..., :, None] * phasors_x[..., None, :]).reshape(
+                phasors_x.shape[:3] + (-1,))
+
+        optical_path_differences = (
+                observatory_coordinates.x[:, None, :, None] * source_sky_coordinates.x[:, :, None, :] +
+                observatory_coordinates.y[:, None, :, None] * source_sky_coordinates.y[:, :, None, :])
+        return aperture_radius * np.exp(1j * wave_number * optical_path_differences)
+
+    def _is_wavelength_invariant(self, wavelengths: np.ndarray, source_sky_coordinates: Coordinates) -> bool:
+        """Return whether the sky coordinates of a source scale linearly with the wavelength, as is the case for sources
+        whose sky coordinates are defined on the wavelength-dependent field of view. In this case, the phase term of
+        the input complex amplitudes is the same for all wavelengths.
+
+        :param wavelengths: The wavelengths in units of meters
+        :param source_sky_coordinates: The source sky coordinates in radians of shape (times, wavelengths, pixels)
+        :return: Whether the sky coordinates scale linearly with the wavelength
+        """
+        if source_sky_coordinates.x.shape[1] < 2:
+            return False
+        for sky_coordinates in (source_sky_coordinates.x, source_sky_coordinates.y):
+            scaled_sky_coordinates = sky_coordinates / wavelengths[None, :, None]
+            if not np.allclose(scaled_sky_coordinates, scaled_sky_coordinates[:, :1], rtol=0,
+                               atol=1e-10 * np.abs(scaled_sky_coordinates).max()):
+                return False
+        return True
 
     def _get_intensity_responses(self,
-                                 time: astropy.units.Quantity,
-                                 wavelength: astropy.units.Quantity,
-                                 source_sky_coordinates: np.ndarray,
-                                 observatory_coordinates: np.ndarray,
-                                 aperture_radius: astropy.units.Quantity,
+                                 wavelengths: np.ndarray,
+                                 source_sky_coordinates: Coordinates,
+                                 observatory_coordinates: Coordinates,
+                                 aperture_radius: float,
                                  beam_combination_matrix: np.ndarray,
-                                 number_of_inputs: int,
-                                 number_of_outputs: int,
                                  fiber_injection_variability: bool,
                                  optical_path_difference_variability_apply: bool,
-                                 optical_path_difference_distribution: np.ndarray,
-                                 grid_size: int) -> np.ndarray:
-        """Return the intensity response vector consisting of the intensity responses of each input collector.
-
-        :param time: The time
-        :param wavelength: The wavelength
-        :param source_sky_coordinates: The source sky coordinates
-        :param observatory_coordinates: The observatory coordinates
-        :param aperture_radius: The aperture radius
-        :param beam_combination_matrix: The bea, combination transfer matrix
-        :param number_of_inputs: The number of inputs, i.e. collectors
-        :param number_of_outputs: The number of interferometric outputs
+                                 optical_path_difference_distribution: np.ndarray) -> np.ndarray:
+        """Return the intensity responses of each output for all times, wavelengths and pixels at once.
+
+        :param wavelengths: The wavelengths in units of meters
+        :param source_sky_coordinates: The source sky coordinates in radians of shape (times, wavelengths, pixels)
+        :param observatory_coordinates: The observatory coordinates in meters of shape (times, inputs)
+        :param aperture_radius: The aperture radius in meters
+        :param beam_combination_matrix: The beam combination transfer matrix
         :param fiber_injection_variability: Whether fiber injection variability should be modeled
         :param optical_path_difference_variability_apply: Whether optical path difference variability should be modeled
-        :param optical_path_difference_distribution: The distribution to sample the OPD
-        :param grid_size: The grid size for the calculations
-        :return: The intensity response vector
+        :param optical_path_difference_distribution: The distribution to sample the OPD in units of meters
+        :return: The intensity responses in units of m^2 of shape (times, wavelengths, outputs, pixels), where the
+            wavelength axis has length 1 if the intensity responses are identical for all wavelengths
         """
-        input_complex_amplitudes = self._get_input_complex_amplitudes(time=time,
-                                                                      wavelength=wavelength,
+        perturbed = fiber_injection_variability or optical_path_difference_variability_apply
+
+        # If the sky coordinates of the source scale with the wavelength, the phases of the input complex amplitudes
+        # are identical for all wavelengths and the intensity responses are only calculated for the first wavelength
+        if not perturbed and self._is_wavelength_invariant(wavelengths, source_sky_coordinates):
+            wavelengths = wavelengths[:1]
+            source_sky_coordinates = Coordinates(source_sky_coordinates.x[:, :1], source_sky_coordinates.y[:, :1])
+
+        input_complex_amplitudes = self._get_input_complex_amplitudes(wavelengths=wavelengths,
                                                                       source_sky_coordinates=source_sky_coordinates,
                                                                       observatory_coordinates=observatory_coordinates,
-                                                                      aperture_radius=aperture_radius,
-                                                                      number_of_inputs=number_of_inputs,
-                                                                      grid_size=grid_size)
-        input_complex_amplitudes = np.reshape(input_complex_amplitudes, (number_of_inputs, grid_size ** 2))
+                                                                      aperture_radius=aperture_radius)
 
-        if fiber_injection_variability or optical_path_difference_variability_apply:
-            perturbation_matrix = self._get_perturbation_matrix(
-                wavelength=wavelength,
+        if perturbed:
+            perturbations = self._get_perturbations(
+                wavelengths=wavelengths,
                 fiber_injection_variability=fiber_injection_variability,
                 optical_path_difference_variability_apply=optical_path_difference_variability_apply,
                 optical_path_difference_distribution=optical_path_difference_distribution,
-                number_of_inputs=number_of_inputs)
-            input_complex_amplitudes = np.dot(perturbation_matrix, input_complex_amplitudes)
+                number_of_time_steps=len(observatory_coordinates.x),
+                number_of_inputs=input_complex_amplitudes.shape[2])
+            input_complex_amplitudes = perturbations[..., None] * input_complex_amplitudes
 
-        intensity_responses = abs(np.dot(beam_combination_matrix, input_complex_amplitudes)) ** 2
-        intensity_responses = np.reshape(intensity_responses, (number_of_outputs, grid_size, grid_size))
-        return intensity_responses
+        return abs(np.matmul(beam_combination_matrix, input_complex_amplitudes)) ** 2
 
-    def _get_normalization(self, source_sky_brightness_distribution: np.ndarray) -> float:
-        """Return the normalization that accounts for the discretization of the sky brightness distribution map into
+    def _get_normalization(self, source_sky_brightness_distribution: np.ndarray) -> np.ndarray:
+        """Return the normalization that accounts for the discretization of the sky brightness distribution maps into
         pixels. Count all pixels that have a non-zero value.
 
-        :param source_sky_brightness_distribution: The source sky brightness distribution
-        :return: The normalization
+        :param source_sky_brightness_distribution: The source sky brightness distributions of shape (..., pixels)
+        :return: The normalizations of shape (...)
         """
-        return len(source_sky_brightness_distribution[source_sky_brightness_distribution.value > 0]) if not len(
-            source_sky_brightness_distribution[source_sky_brightness_distribution.value > 0]) == 0 else 1
-
-    def _get_perturbation_matrix(self,
-                                 wavelength: astropy.units.Quantity,
-                                 fiber_injection_variability: bool,
-                                 optical_path_difference_variability_apply: bool,
-                                 optical_path_difference_distribution: np.ndarray,
-                                 number_of_inputs: int) -> np.ndarray:
-        """Return the perturbation matrix with randomly generated noise.
-
-        :param wavelength: The wavelength
+        normalization = np.count_nonzero(source_sky_brightness_distribution > 0, axis=-1)
+        return np.where(normalization == 0, 1, normalization)
+
+    def _get_perturbations(self,
+                           wavelengths: np.ndarray,
+                           fiber_injection_variability: bool,
+                           optical_path_difference_variability_apply: bool,
+                           optical_path_difference_distribution: np.ndarray,
+                           number_of_time_steps: int,
+                           number_of_inputs: int) -> np.ndarray:
+        """Return the diagonal elements of the perturbation matrices with randomly generated noise.
+
+        :param wavelengths: The wavelengths in units of meters
         :param fiber_injection_variability: Whether fiber injection variability should be modeled
         :param optical_path_difference_variability_apply: Whether optical path difference variability should be modeled
-        :param optical_path_difference_distribution: The distribution to sample the OPD
+        :param optical_path_difference_distribution: The distribution to sample the OPD in units of meters
+        :param number_of_time_steps: The number of time steps
         :param number_of_inputs: The number of inputs, i.e. collectors
-        :return:
+        :return: The perturbations of shape (times, wavelengths, inputs)
         """
-        diagonal_of_matrix = []
-
-        for index in range(number_of_inputs):
-            amplitude_factor = 1
-            phase_difference = 0 * u.um
-            # TODO: Use more realistic distributions
-            if fiber_injection_variability:
-                amplitude_factor = np.random.uniform(0.8, 0.9)
-            if optical_path_difference_variability_apply:
-                phase_difference = choice(optical_path_difference_distribution).to(u.um)
+        shape = (number_of_time_steps, len(wavelengths), number_of_inputs)
+        amplitude_factors = np.ones(shape)
+        phase_differences = np.zeros(shape)
 
-            diagonal_of_matrix.append(amplitude_factor * np.exp(2j * np.pi / wavelength * phase_difference))
+        # TODO: Use more realistic distributions
+        if fiber_injection_variability:
+            amplitude_factors = self._random_number_generator.uniform(0.8, 0.9, shape)
+        if optical_path_difference_variability_apply:
+            phase_differences = self._random_number_generator.choice(optical_path_difference_distribution, shape)
 
-        return np.diag(diagonal_of_matrix)
+        return amplitude_factors * np.exp(2j * np.pi / wavelengths[None, :, None] * phase_differences)
 
     def _get_photon_counts_per_output(self,
                                       source_sky_brightness_distribution: np.ndarray,
-                                      wavelength_bin_width: astropy.units.Quantity,
-                                      index_wavelength: int,
+                                      wavelength_bin_widths: np.ndarray,
                                       intensity_responses: np.ndarray,
-                                      time_step: astropy.units.Quantity,
-                                      unperturbed_instrument_throughput: float) -> Tuple[list, np.ndarray]:
-        """Return the photon counts per output, i.e. for a given intensity response map, including photon noise.
-
-        :param mean_spectral_flux_density: Mean spectral density of the source at a given wavelength
-        :param source_sky_brightness_distribution: Shape map of the source
-        :param wavelength_bin_width: Wavelength bin width
-        :param intensity_response: Intensity response map
-        :return: Photon counts in units of photons
+                                      time_step: float,
+                                      unperturbed_instrument_throughput: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the mean photon counts per output for all times and wavelengths at once.
+
+        :param source_sky_brightness_distribution: The sky brightness distribution in units of ph / (m^2 s um) of shape
+            (times, wavelengths, pixels)
+        :param wavelength_bin_widths: The wavelength bin widths in units of um
+        :param intensity_responses: The intensity responses in units of m^2 of shape (times, wavelengths, outputs,
+            pixels)
+        :param time_step: The time step in units of s
+        :param unperturbed_instrument_throughput: The unperturbed instrument throughput
+        :return: The mean photon counts of shape (times, wavelengths, outputs) and, in template mode, the effective
+            areas in units of m^2 of the same shape
         """
         normalization = self._get_normalization(source_sky_brightness_distribution)
-        photon_counts_per_output = []
 
         if self._mode == GenerationMode.template:
-            effective_area = np.zeros(len(intensity_responses)) * u.m ** 2
-
             # Normalize planet sky brightness distribution to 1
-            source_sky_brightness_distribution[np.isnan(source_sky_brightness_distribution)] = 0
-            source_sky_brightness_distribution /= source_sky_brightness_distribution.value.max()
-
-            for index_intensity_response, intensity_response in enumerate(intensity_responses):
-                mean_photon_counts = (np.sum(intensity_response
-                                             * source_sky_brightness_distribution
-                                             * time_step.to(u.s)
-                                             * wavelength_bin_width
-                                             * unperturbed_instrument_throughput).value
-                                      / normalization)
-
-                # Calculate effective area, i.e. area including all throughput terms, using the pixel of the intensity
-                # response where the planet is located
-                effective_area[index_intensity_response] = np.sum(
-                    intensity_response * unperturbed_instrument_throughput * source_sky_brightness_distribution.value)
-                photon_counts_per_output.append(mean_photon_counts * u.ph)
-            return photon_counts_per_output, effective_area
+            source_sky_brightness_distribution = np.nan_to_num(source_sky_brightness_distribution, nan=0)
+            source_sky_brightness_distribution = (source_sky_brightness_distribution
+                                                  / source_sky_brightness_distribution.max(axis=-1, keepdims=True))
+
+        # Sum the intensity responses weighted by the sky brightness distribution over all pixels
+        weighted_intensity_responses = np.matmul(intensity_responses, source_sky_brightness_distribution[..., None])[
+            ..., 0]
+        mean_photon_counts = (weighted_intensity_responses
+                              * time_step
+                              * wavelength_bin_widths[None, :, None]
+                              * unperturbed_instrument_throughput
+                              / normalization[:, :, None])
 
-        else:
-            for index_intensity_response, intensity_response in enumerate(intensity_responses):
-                mean_photon_counts = (np.sum(intensity_response
-                                             * source_sky_brightness_distribution
-                                             * time_step.to(u.s)
-                                             * wavelength_bin_width
-                                             * unperturbed_instrument_throughput).value
-                                      / normalization)
+        if self._mode == GenerationMode.template:
+            # Calculate effective area, i.e. area including all throughput terms, using the pixel of the intensity
+            # response where the planet is located
+            effective_area = weighted_intensity_responses * unperturbed_instrument_throughput
+            return mean_photon_counts, effective_area
 
-                photon_counts_per_output.append(self._get_photon_shot_noise(mean_photon_counts=mean_photon_counts))
-            return photon_counts_per_output, None
+        return mean_photon_counts, None
 
-    def _get_photon_shot_noise(self, mean_photon_counts: int) -> astropy.units.Quantity:
-        """Given an amount of photons, calculate and return the amount of photons given by drawing from a Poisson/
-        Gaussian distribution.
+    def _get_photon_shot_noise(self, mean_photon_counts: np.ndarray) -> np.ndarray:
+        """Given an array of mean photon counts, calculate and return the photon counts given by drawing from a
+        Poisson distribution. For large mean photon counts, the Poisson distribution is approximated by a Gaussian
+        distribution with a variance equal to the mean.
 
         :param mean_photon_counts: The mean photon counts
         :return: The photon counts considering shot noise
         """
-        try:
-            photon_counts = poisson(mean_photon_counts, 1)
-        except ValueError:
-            photon_counts = round(normal(mean_photon_counts, 1))
-        return photon_counts * u.ph
+        maximum_poisson_mean = 1e4
+        photon_counts = np.empty(mean_photon_counts.shape)
+        poisson_mask = mean_photon_counts < maximum_poisson_mean
+        gaussian_mask = ~poisson_mask
+
+        photon_counts[poisson_mask] = self._random_number_generator.poisson(
+            np.maximum(mean_photon_counts[poisson_mask], 0))
+        photon_counts[gaussian_mask] = np.round(self._random_number_generator.normal(
+            mean_photon_counts[gaussian_mask], np.sqrt(mean_photon_counts[gaussian_mask])))
+        return photon_counts
+
+    def _add_differential_photon_counts(self,
+                                        time_chunk: slice,
+                                        mean_photon_counts_per_output: np.ndarray,
+                                        effective_area: Optional[np.ndarray],
+                                        differential_output_pairs: list):
+        """Add the differential photon counts and, in template mode, the differential effective areas for a chunk of
+        time steps. In data mode, the photon noise is drawn from the mean photon counts summed over all sources. The
+        mean photon counts per output are stored as well.
+
+        :param time_chunk: The slice of time indices
+        :param mean_photon_counts_per_output: The mean photon counts of shape (times, wavelengths, outputs)
+        :param effective_area: The effective areas in units of m^2 of shape (times, wavelengths, outputs) or None
+        :param differential_output_pairs: The pairs of differential outputs
+        """
+        self.mean_photon_counts_per_output[:, :, time_chunk] = mean_photon_counts_per_output.T
+
+        if self._mode == GenerationMode.data and self._draw_photon_noise:
+            photon_counts_per_output = self._get_photon_shot_noise(mean_photon_counts=mean_photon_counts_per_output)
+        else:
+            photon_counts_per_output = mean_photon_counts_per_output
+
+        # For each pair of differential outputs, calculate the differential photon counts. The counts are transposed
+        # from (times, wavelengths) to (wavelengths, times)
+        for index_pair, differential_output_pair in enumerate(differential_output_pairs):
+            self.differential_photon_counts[index_pair, :, time_chunk] += self._get_differential_photon_counts(
+                photon_counts_per_output=np.moveaxis(photon_counts_per_output, 2, 0),
+                differential_output_pair=differential_output_pair).T
+            if effective_area is not None:
+                self._differential_effective_area[index_pair, :, time_chunk] = self._get_differential_photon_counts(
+                    photon_counts_per_output=np.moveaxis(effective_area, 2, 0),
+                    differential_output_pair=differential_output_pair).T
 
     def _update_animation_frame(self, time, intensity_responses, pair_of_indices, index_pair, index_wavelength,
-                                source, wavelength, index_time):
+                                index_time):
+        grid_size = int(np.sqrt(intensity_responses.shape[-1]))
+        differential_intensity_response = intensity_responses[pair_of_indices[0]] - intensity_responses[
+            pair_of_indices[1]]
         self._context.animator.update_collector_position(time, self._context.observatory)
         self._context.animator.update_differential_intensity_response(
-            intensity_responses[pair_of_indices[0]] - intensity_responses[pair_of_indices[1]])
+            differential_intensity_response.reshape(grid_size, grid_size) * u.m ** 2)
         self._context.animator.update_differential_photon_counts(
             self.differential_photon_counts[index_pair][index_wavelength][
                 index_time], index_time)
         self._context.animator.writer.grab_frame()
 
     def generate_data(self) -> Tuple[np.ndarray, np.ndarray]:
-        """Generate the differential photon counts. This is the main method of the data generation. The calculation
-        procedure is as follows: For each time step, for each wavelength bin, for each photon source, calculate  the
-        intensity response vector at that time, wavelength and angular resolution corresponding to the source and then,
-        for each differential output, calculate the differential photon counts.
-        """
-        for index_time, time in enumerate(
-                tqdm(self._context.time_range, disable=self._mode == GenerationMode.template)):
-
-            index_time_planet_motion = self._get_index_planet_motion(index_time)
+        """Generate the differential photon counts. This is the main method of the data generation, see
+        generate_data_chunks for the calculation procedure.
 
-            for index_wavelength, source in product(
-                    range(len(self._context.observatory.instrument_parameters.wavelength_bin_centers)),
-                    self._context.photon_sources
-            ):
-
-                wavelength = self._context.observatory.instrument_parameters.wavelength_bin_centers[index_wavelength]
+        :return: A tuple containing the differential photon counts and the differential effective areas
+        """
+        for _ in self.generate_data_chunks():
+            pass
+        return self.differential_photon_counts, self.differential_effective_area
 
-                # Calculate the vector of intensity responses, each intensity response corresponding to one output
+    def generate_data_chunks(self) -> Iterator[Tuple[slice, np.ndarray]]:
+        """Generate the differential photon counts chunk by chunk and yield each chunk as soon as it is calculated, such
+        that the data can be processed while it is being generated and the generation can be stopped early. The
+        calculation procedure is as follows: The time range is split into chunks. For each chunk and for each photon
+        source, calculate the intensity responses for all times, wavelengths and pixels at once, using the angular
+        resolution corresponding to the source, and then, for each differential output, calculate the differential
+        photon counts. If enabled, the photon counts of extended sources are instead calculated from their
+        visibilities. The photon noise is drawn from the mean photon counts summed over all sources. If enabled and the
+        signal is periodic, only the first modulation period is simulated and its mean photon counts are tiled over the
+        full time range chunk by chunk before drawing the photon noise.
+
+        :return: An iterator over tuples containing the slice of time indices and the differential photon counts of
+            shape (differential outputs, wavelengths, times) of each chunk
+        """
+        self.differential_photon_counts[:] = 0
+        self._differential_effective_area[:] = 0
+        self.mean_photon_counts_per_output[:] = 0
+
+        # All quantities are converted to plain arrays in canonical units once, units are only reattached to the results
+        plan = SimulationPlan(self._context)
+        wavelengths = plan.wavelengths
+        observatory_coordinates = plan.observatory_coordinates
+        number_of_time_steps = len(plan.time_range)
+        number_of_outputs = plan.number_of_outputs
+        number_of_time_steps_per_period = self._get_number_of_time_steps_per_period(plan)
+
+        # If the signal is periodic, only the mean photon counts of the first modulation period are simulated
+        if number_of_time_steps_per_period is not None:
+            number_of_time_steps = number_of_time_steps_per_period
+            mean_photon_counts_per_output_period = np.zeros((number_of_time_steps, len(wavelengths), number_of_outputs))
+            effective_area_period = np.zeros((number_of_time_steps, len(wavelengths), number_of_outputs))
+
+        for time_chunk in tqdm(self._get_time_chunks(number_of_time_steps),
+                               disable=self._mode == GenerationMode.template):
+            indices_time = self._get_source_indices_time(time_chunk)
+            observatory_coordinates_chunk = Coordinates(observatory_coordinates.x[time_chunk],
+                                                        observatory_coordinates.y[time_chunk])
+            mean_photon_counts_per_output = np.zeros(
+                (time_chunk.stop - time_chunk.start, len(wavelengths), number_of_outputs))
+            effective_area = None
+            animation_intensity_responses = None
+
+            for source in self._context.photon_sources:
+                visibilities = None
+                if self._use_visibilities and self._mode == GenerationMode.data:
+                    visibilities = source.get_visibilities(self._get_baselines(observatory_coordinates_chunk),
+                                                           wavelengths)
+
+                # For extended sources that provide visibilities, the pixel sum is replaced by the visibility matrix
+                if visibilities is not None:
+                    mean_photon_counts_per_output += self._get_photon_counts_per_output_from_visibilities(
+                        wavelengths=wavelengths,
+                        visibilities=visibilities,
+                        aperture_radius=plan.aperture_radius,
+                        beam_combination_matrix=plan.beam_combination_matrix,
+                        wavelength_bin_widths=plan.wavelength_bin_widths,
+                        time_step=plan.time_step,
+                        unperturbed_instrument_throughput=plan.unperturbed_instrument_throughput,
+                        fiber_injection_variability=plan.fiber_injection_variability,
+                        optical_path_difference_variability_apply=plan.optical_path_difference_variability_apply,
+                        optical_path_difference_distribution=plan.optical_path_difference_distribution)
+                    continue
+
+                # For point sources, only the pixel containing the source is considered
+                if self._use_point_source_path(source):
+                    source_sky_coordinates, source_sky_brightness_distribution = plan.get_point_source_sky_position(
+                        source, indices_time)
+                else:
+                    source_sky_coordinates, source_sky_brightness_distribution = \
+                        plan.get_source_sky_coordinates_and_brightness(source, indices_time)
+
+                # Calculate the intensity responses, each intensity response corresponding to one output
                 intensity_responses = self._get_intensity_responses(
-                    time=time,
-                    wavelength=wavelength,
-                    source_sky_coordinates=source.get_sky_coordinates(index_time_planet_motion, index_wavelength),
-                    observatory_coordinates=self._context.observatory.array_configuration.get_collector_positions(time),
-                    aperture_radius=self._context.observatory.instrument_parameters.aperture_radius,
-                    beam_combination_matrix=self._context.observatory.beam_combination_scheme.get_beam_combination_transfer_matrix(),
-                    number_of_inputs=self._context.observatory.beam_combination_scheme.number_of_inputs,
-                    number_of_outputs=self._context.observatory.beam_combination_scheme.number_of_outputs,
-                    fiber_injection_variability=self._context.settings.noise_contributions.fiber_injection_variability,
-                    optical_path_difference_variability_apply=self._context.settings.noise_contributions.optical_path_difference_variability.apply,
-                    optical_path_difference_distribution=self._context.settings.noise_contributions.optical_path_difference_distribution,
-                    grid_size=self._context.settings.grid_size)
-
-                # Calculate the photon counts at each of the outputs
-                photon_counts_per_output, effective_area = self._get_photon_counts_per_output(
-                    source_sky_brightness_distribution=source.get_sky_brightness_distribution(index_time_planet_motion,
-                                                                                              index_wavelength),
-                    wavelength_bin_width=self._context.observatory.instrument_parameters.wavelength_bin_widths[
-                        index_wavelength],
-                    index_wavelength=index_wavelength,
+                    wavelengths=wavelengths,
+                    source_sky_coordinates=source_sky_coordinates,
+                    observatory_coordinates=observatory_coordinates_chunk,
+                    aperture_radius=plan.aperture_radius,
+                    beam_combination_matrix=plan.beam_combination_matrix,
+                    fiber_injection_variability=plan.fiber_injection_variability,
+                    optical_path_difference_variability_apply=plan.optical_path_difference_variability_apply,
+                    optical_path_difference_distribution=plan.optical_path_difference_distribution)
+
+                # Calculate the mean photon counts at each of the outputs
+                source_mean_photon_counts_per_output, source_effective_area = self._get_photon_counts_per_output(
+                    source_sky_brightness_distribution=source_sky_brightness_distribution,
+                    wavelength_bin_widths=plan.wavelength_bin_widths,
                     intensity_responses=intensity_responses,
-                    time_step=self._context.settings.time_step,
-                    unperturbed_instrument_throughput=self._context.observatory.instrument_parameters.unperturbed_instrument_throughput)
-
-                # For each pair of differential outputs, calculate the differential photon counts
-                for index_pair, differential_output_pair in enumerate(
-                        self._context.observatory.beam_combination_scheme.get_differential_output_pairs()):
-                    self.differential_photon_counts[index_pair][index_wavelength][
-                        index_time] += self._get_differential_photon_counts(
-                        photon_counts_per_output=photon_counts_per_output,
-                        differential_output_pair=differential_output_pair).value
-                    if self._mode == GenerationMode.template:
-                        self.differential_effective_area[index_pair][index_wavelength][index_time] = effective_area[
-                                                                                                         differential_output_pair[
-                                                                                                             0]] - \
-                                                                                                     effective_area[
-                                                                                                         differential_output_pair[
-                                                                                                             1]]
-
-                    if self._context.animator and (
-                            source.name == self._context.animator.planet_name and
-                            wavelength == self._context.animator.closest_wavelength and
-                            index_pair == self._context.animator.differential_intensity_response_index):
-                        self._update_animation_frame(time, intensity_responses, differential_output_pair, index_pair,
-                                                     index_wavelength, source, wavelength, index_time)
-        return self.differential_photon_counts, self.differential_effective_area
+                    time_step=plan.time_step,
+                    unperturbed_instrument_throughput=plan.unperturbed_instrument_throughput)
+                mean_photon_counts_per_output += source_mean_photon_counts_per_output
+                if source_effective_area is not None:
+                    effective_area = source_effective_area
+
+                if (self._context.animator and isinstance(source, Planet)
+                        and source.name == self._context.animator.planet_name):
+                    animation_intensity_responses = intensity_responses[
+                        :, self._context.animator.index_closest_wavelength]
+
+            if number_of_time_steps_per_period is not None:
+                mean_photon_counts_per_output_period[time_chunk] = mean_photon_counts_per_output
+                if effective_area is not None:
+                    effective_area_period[time_chunk] = effective_area
+                continue
+
+            self._add_differential_photon_counts(time_chunk=time_chunk,
+                                                 mean_photon_counts_per_output=mean_photon_counts_per_output,
+                                                 effective_area=effective_area,
+                                                 differential_output_pairs=plan.differential_output_pairs)
+
+            if animation_intensity_responses is not None:
+                index_pair = self._context.animator.differential_intensity_response_index
+                times = self._context.time_range[time_chunk]
+                for index_chunk, index_time in enumerate(range(time_chunk.start, time_chunk.stop)):
+                    self._update_animation_frame(times[index_chunk],
+                                                 animation_intensity_responses[index_chunk],
+                                                 plan.differential_output_pairs[index_pair],
+                                                 index_pair,
+                                                 self._context.animator.index_closest_wavelength,
+                                                 index_time)
+
+            yield time_chunk, self.differential_photon_counts[:, :, time_chunk]
+
+        # Tile the mean photon counts of the simulated modulation period over the full time range chunk by chunk
+        if number_of_time_steps_per_period is not None:
+            for time_chunk in self._get_time_chunks(len(plan.time_range)):
+                indices_period = np.arange(time_chunk.start, time_chunk.stop) % number_of_time_steps_per_period
+                self._add_differential_photon_counts(
+                    time_chunk=time_chunk,
+                    mean_photon_counts_per_output=mean_photon_counts_per_output_period[indices_period],
+                    effective_area=(effective_area_period[indices_period] if self._mode == GenerationMode.template
+                                    else None),
+                    differential_output_pairs=plan.differential_output_pairs)
+                yield time_chunk, self.differential_photon_counts[:, :, time_chunk]
+
+        self.differential_effective_area = self._differential_effective_area * u.m ** 2
+
+    def generate_data_realizations(self, number_of_realizations: int) -> np.ndarray:
+        """Generate independent noise realizations of the differential photon counts. The deterministic mean photon
+        counts per output are only calculated once and the photon noise of all realizations is drawn from them in a
+        single vectorized draw. If instrument perturbations are modeled, the mean photon counts depend on the random
+        perturbations and are thus recalculated for each realization before drawing the photon noise.
+
+        :param number_of_realizations: The number of realizations
+        :return: The differential photon counts of shape (realizations, differential outputs, wavelengths, times)
+        """
+        differential_output_pairs = self._context.observatory.beam_combination_scheme.get_differential_output_pairs()
+        perturbed = (self._context.settings.noise_contributions.fiber_injection_variability
+                     or self._context.settings.noise_contributions.optical_path_difference_variability.apply)
+
+        self._draw_photon_noise = False
+        try:
+            if perturbed:
+                mean_photon_counts_per_output = np.zeros(
+                    (number_of_realizations,) + self.mean_photon_counts_per_output.shape)
+                for index_realization in tqdm(range(number_of_realizations)):
+                    self.generate_data()
+                    mean_photon_counts_per_output[index_realization] = self.mean_photon_counts_per_output
+            else:
+                self.generate_data()
+                mean_photon_counts_per_output = np.broadcast_to(
+                    self.mean_photon_counts_per_output,
+                    (number_of_realizations,) + self.mean_photon_counts_per_output.shape)
+        finally:
+            self._draw_photon_noise = True
+
+        # Draw the photon noise of all realizations at once, the counts are of shape (realizations, outputs,
+        # wavelengths, times) and the outputs are moved to the first axis for the differential combination
+        photon_counts_per_output = np.moveaxis(
+            self._get_photon_shot_noise(mean_photon_counts=mean_photon_counts_per_output), 1, 0)
+        return np.stack([self._get_differential_photon_counts(photon_counts_per_output=photon_counts_per_output,
+                                                              differential_output_pair=differential_output_pair)
+                         for differential_output_pair in differential_output_pairs], axis=1)
+
+    def _get_point_source_template_signals(self,
+                                           plan: SimulationPlan,
+                                           normalized_spectral_flux_density: np.ndarray,
+                                           sky_coordinates_x: np.ndarray,
+                                           sky_coordinates_y: np.ndarray,
+                                           time_chunks: list,
+                                           show_progress: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the differential photon counts and effective areas of a planet placed at each of the given sky
+        positions. The intensity responses of all positions are calculated at once per chunk of time steps.
+
+        :param plan: The simulation plan
+        :param normalized_spectral_flux_density: The normalized planet spectral flux density of shape (wavelengths)
+        :param sky_coordinates_x: The x-sky coordinates of the positions in radians
+        :param sky_coordinates_y: The y-sky coordinates of the positions in radians
+        :param time_chunks: The slices of time indices that are processed at once
+        :param show_progress: Whether a progress bar should be shown
+        :return: A tuple containing the differential photon counts and the differential effective areas in units of
+            m^2, each of shape (positions, differential outputs, wavelengths, times)
+        """
+        wavelengths = plan.wavelengths
+        number_of_pixels = sky_coordinates_x.size
+        source_sky_coordinates = Coordinates(
+            np.broadcast_to(sky_coordinates_x.reshape(1, 1, -1), (1, len(wavelengths), number_of_pixels)),
+            np.broadcast_to(sky_coordinates_y.reshape(1, 1, -1), (1, len(wavelengths), number_of_pixels)))
+
+        differential_photon_counts = np.zeros(
+            (number_of_pixels, len(plan.differential_output_pairs), len(wavelengths), len(plan.time_range)))
+        differential_effective_area = np.zeros(differential_photon_counts.shape)
+
+        for time_chunk in tqdm(time_chunks, disable=not show_progress):
+            intensity_responses = self._get_intensity_responses(
+                wavelengths=wavelengths,
+                source_sky_coordinates=source_sky_coordinates,
+                observatory_coordinates=Coordinates(plan.observatory_coordinates.x[time_chunk],
+                                                    plan.observatory_coordinates.y[time_chunk]),
+                aperture_radius=plan.aperture_radius,
+                beam_combination_matrix=plan.beam_combination_matrix,
+                fiber_injection_variability=plan.fiber_injection_variability,
+                optical_path_difference_variability_apply=plan.optical_path_difference_variability_apply,
+                optical_path_difference_distribution=plan.optical_path_difference_distribution)
+            effective_area = (intensity_responses
+                              * normalized_spectral_flux_density[None, :, None, None]
+                              * plan.unperturbed_instrument_throughput)
+            mean_photon_counts = effective_area * plan.time_step * plan.wavelength_bin_widths[None, :, None, None]
+
+            # Transpose the differential counts from (times, wavelengths, pixels) to (pixels, wavelengths, times)
+            for index_pair, differential_output_pair in enumerate(plan.differential_output_pairs):
+                differential_photon_counts[:, index_pair, :, time_chunk] = self._get_differential_photon_counts(
+                    photon_counts_per_output=np.moveaxis(mean_photon_counts, 2, 0),
+                    differential_output_pair=differential_output_pair).T
+                differential_effective_area[:, index_pair, :, time_chunk] = self._get_differential_photon_counts(
+                    photon_counts_per_output=np.moveaxis(effective_area, 2, 0),
+                    differential_output_pair=differential_output_pair).T
+
+        return differential_photon_counts, differential_effective_area
+
+    def _get_point_source_template_signals_of_planet(self,
+                                                     plan: SimulationPlan,
+                                                     planet: Planet,
+                                                     sky_coordinates_x: np.ndarray,
+                                                     sky_coordinates_y: np.ndarray,
+                                                     workers: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the differential photon counts and effective areas of a planet placed at each of the given sky
+        positions. As in the template mode, the planet sky brightness distribution is normalized to 1. If more than one
+        worker is used, the positions are split into contiguous chunks, which are processed in separate processes and
+        concatenated in their original order, such that the result does not depend on the number of workers.
+
+        :param plan: The simulation plan
+        :param planet: The planet
+        :param sky_coordinates_x: The x-sky coordinates of the positions in radians
+        :param sky_coordinates_y: The y-sky coordinates of the positions in radians
+        :param workers: The number of worker processes
+        :return: A tuple containing the differential photon counts and the differential effective areas in units of
+            m^2, each of shape (positions, differential outputs, wavelengths, times)
+        """
+        # The normalized planet spectral flux density is 1, or undefined if the planet does not emit at a wavelength
+        normalized_spectral_flux_density = np.where(planet.mean_spectral_flux_density.value > 0, 1, np.nan)
+        number_of_pixel_chunks = max(1, min(workers, sky_coordinates_x.size))
+        time_chunks = self._get_time_chunks(len(plan.time_range), -(-sky_coordinates_x.size // number_of_pixel_chunks))
+
+        if number_of_pixel_chunks == 1:
+            return self._get_point_source_template_signals(plan,
+                                                           normalized_spectral_flux_density,
+                                                           sky_coordinates_x,
+                                                           sky_coordinates_y,
+                                                           time_chunks)
+
+        with ProcessPoolExecutor(max_workers=number_of_pixel_chunks) as executor:
+            futures = [executor.submit(self._get_point_source_template_signals,
+                                       plan,
+                                       normalized_spectral_flux_density,
+                                       chunk_sky_coordinates_x,
+                                       chunk_sky_coordinates_y,
+                                       time_chunks,
+                                       False)
+                       for chunk_sky_coordinates_x, chunk_sky_coordinates_y in
+                       zip(np.array_split(sky_coordinates_x, number_of_pixel_chunks),
+                           np.array_split(sky_coordinates_y, number_of_pixel_chunks))]
+            results = [future.result() for future in tqdm(futures)]
+
+        return (np.concatenate([differential_photon_counts for differential_photon_counts, _ in results]),
+                np.concatenate([differential_effective_area for _, differential_effective_area in results]))
+
+    def generate_template_bank(self, planet: Planet, workers: int = 1) -> Tuple[np.ndarray, astropy.units.Quantity]:
+        """Generate the differential photon counts and effective areas of a planet for all possible planet positions
+        within the grid at once. Since the planet is a point source, the template of each position is given by the
+        intensity responses at the corresponding pixel, which are calculated for all pixels at once per chunk of time
+        steps.
+
+        :param planet: The planet
+        :param workers: The number of worker processes the pixels are distributed over
+        :return: A tuple containing the differential photon counts and the differential effective areas, each of shape
+            (grid size, grid size, differential outputs, wavelengths, times)
+        """
+        plan = SimulationPlan(self._context)
+        sky_coordinates = planet.get_sky_coordinates(0, 0)
+        grid_shape = sky_coordinates.x.shape
+        differential_photon_counts, differential_effective_area = self._get_point_source_template_signals_of_planet(
+            plan,
+            planet,
+            sky_coordinates.x.to(u.rad).value.ravel(),
+            sky_coordinates.y.to(u.rad).value.ravel(),
+            workers)
+        return (differential_photon_counts.reshape(grid_shape + differential_photon_counts.shape[1:]),
+                differential_effective_area.reshape(grid_shape + differential_effective_area.shape[1:]) * u.m ** 2)
+
+    def generate_templates_at_positions(self,
+                                        planet: Planet,
+                                        sky_coordinates_x: astropy.units.Quantity,
+                                        sky_coordinates_y: astropy.units.Quantity,
+                                        workers: int = 1) -> Tuple[np.ndarray, astropy.units.Quantity]:
+        """Generate the differential photon counts and effective areas of a planet placed at arbitrary sky positions,
+        e.g. on a grid that is finer than the grid of the planet. No perturbations are modeled.
+
+        :param planet: The planet
+        :param sky_coordinates_x: The x-sky coordinates of the positions of arbitrary shape
+        :param sky_coordinates_y: The y-sky coordinates of the positions of the same shape
+        :param workers: The number of worker processes the positions are distributed over
+        :return: A tuple containing the differential photon counts and the differential effective areas, each of shape
+            (..., differential outputs, wavelengths, times), where ... is the shape of the sky coordinates
+        """
+        plan = SimulationPlan(self._context)
+        plan.fiber_injection_variability = False
+        plan.optical_path_difference_variability_apply = False
+        differential_photon_counts, differential_effective_area = self._get_point_source_template_signals_of_planet(
+            plan,
+            planet,
+            sky_coordinates_x.to(u.rad).value.ravel(),
+            sky_coordinates_y.to(u.rad).value.ravel(),
+            workers)
+        positions_shape = sky_coordinates_x.shape
+        return (differential_photon_counts.reshape(positions_shape + differential_photon_counts.shape[1:]),
+                differential_effective_area.reshape(positions_shape + differential_effective_area.shape[1:]) * u.m ** 2)
+
+    def generate_polar_template_bank(
+            self,
+            planet: Planet,
+            number_of_azimuths: int,
+            workers: int = 1) -> Tuple[np.ndarray, astropy.units.Quantity, astropy.units.Quantity,
+                                       astropy.units.Quantity, np.ndarray]:
+        """Generate the differential photon counts and effective areas of a planet for the positions of a polar grid.
+        For circularly rotating arrays, a planet at azimuth phi produces the same signal as a planet at azimuth 0,
+        delayed by phi / omega, where omega is the angular velocity of the array rotation. Thus, the signals are only
+        calculated along a single radial cut at azimuth 0 and the signals at all other azimuths are given by the time
+        shifts corresponding to the azimuths. This requires the time range to cover an integer number of modulation
+        periods and the azimuths to correspond to time shifts by an integer number of time steps.
+
+        :param planet: The planet
+        :param number_of_azimuths: The number of azimuths, which are equally spaced over a full circle. The number of
+            time steps per modulation period must be an integer multiple of it
+        :param workers: The number of worker processes the radii are distributed over
+        :return: A tuple containing the differential photon counts and the differential effective areas along the
+            radial cut, each of shape (radii, differential outputs, wavelengths, times), the radii and azimuths of the
+            polar grid and the time shifts corresponding to the azimuths in units of time steps
+        """
+        if not isinstance(self._context.observatory.array_configuration,
+                          (EmmaXCircularRotation,
+                           EquilateralTriangleCircularRotation,
+                           RegularPentagonCircularRotation)):
+            raise TypeError('Polar template generation is only supported for circularly rotating arrays')
+
+        plan = SimulationPlan(self._context)
+        number_of_periods = len(plan.time_range) * plan.time_step / plan.modulation_period
+        if not np.isclose(number_of_periods, np.round(number_of_periods), rtol=1e-9, atol=0) or number_of_periods < 1:
+            raise ValueError('Polar template generation requires an integer number of modulation periods')
+        time_steps_per_period = plan.modulation_period / plan.time_step
+        number_of_time_steps_per_period = int(np.round(time_steps_per_period))
+        if (not np.isclose(time_steps_per_period, number_of_time_steps_per_period, rtol=1e-9, atol=0)
+                or number_of_time_steps_per_period % number_of_azimuths != 0):
+            raise ValueError(f'Polar template generation requires the number of time steps per modulation period to be '
+                             f'an integer multiple of the number of azimuths ({number_of_azimuths})')
+
+        # The radial cut consists of the non-negative x-sky coordinates of the planet grid
+        sky_coordinates_x = planet.get_sky_coordinates(0, 0).x[0, :].to(u.rad).value
+        radii = sky_coordinates_x[sky_coordinates_x >= 0]
+        azimuths = np.linspace(0, 2 * np.pi, number_of_azimuths, endpoint=False)
+
+        differential_photon_counts, differential_effective_area = self._get_point_source_template_signals_of_planet(
+            plan,
+            planet,
+            radii,
+            np.zeros(radii.shape),
+            workers)
+
+        # A rotation of the planet by phi corresponds to a delay of phi / omega of the signal
+        time_shifts = np.arange(number_of_azimuths) * (number_of_time_steps_per_period // number_of_azimuths)
+        return (differential_photon_counts,
+                differential_effective_area * u.m ** 2,
+                (radii * u.rad).to(u.arcsec),
+                azimuths * u.rad,
+                time_shifts)
@@ -0,0 +1,126 @@
+import numpy as np
+
+from sygn.core.template import TemplateBank
+
+
+class RunningStatistics():
+    """Class representation of the running sufficient statistics of the maximum likelihood extraction. The matrices B
+    and C are sums over the time axis and the data variance can be updated chunk by chunk, such that the statistics can
+    be accumulated from signal chunks as they arrive and the cost function is valid for the data observed so far at any
+    point. The template signals are only evaluated at the times of each chunk and for chunks of templates that do not
+    exceed the maximum memory size, such that template banks that are not stored in the time domain are never expanded
+    as a whole.
+    """
+
+    def __init__(self, template_bank: TemplateBank, maximum_memory_size: int = None):
+        """Constructor method.
+
+        :param template_bank: The template bank, whose signals may be memory-mapped
+        :param maximum_memory_size: The maximum number of bytes of template signals that are processed at once. If None,
+            all templates are processed at once
+        """
+        self._template_bank = template_bank
+        self._maximum_memory_size = maximum_memory_size
+        self._grid_shape = tuple(template_bank.shape)
+        self._number_of_templates = int(np.prod(self._grid_shape))
+        self._number_of_outputs, self._number_of_wavelengths, number_of_time_steps = template_bank[0, 0].signal.shape
+        self.number_of_time_steps = 0
+        self.observed = np.zeros(number_of_time_steps, dtype=bool)
+        self._mean = np.zeros((self._number_of_outputs, self._number_of_wavelengths))
+        self._sum_of_squared_deviations = np.zeros(self._mean.shape)
+        self._sum_of_products = np.zeros((self._number_of_templates,) + self._mean.shape)
+        self._sum_of_template_energies = np.zeros(self._sum_of_products.shape)
+
+    def _get_template_chunks(self, number_of_time_steps: int) -> list:
+        """Return the slices of flattened template indices that are processed at once, such that the template signals
+        of a chunk over the given number of time steps do not exceed the maximum memory size.
+
+        :param number_of_time_steps: The number of time steps of the template signals
+        :return: A list of slices of template indices
+        """
+        if self._maximum_memory_size is None:
+            return [slice(0, self._number_of_templates)]
+        chunk_length = max(1, self._maximum_memory_size // (self._number_of_outputs * self._number_of_wavelengths
+                                                            * number_of_time_steps * np.dtype(float).itemsize))
+        return [slice(index_start, min(index_start + chunk_length, self._number_of_templates)) for index_start in
+                range(0, self._number_of_templates, chunk_length)]
+
+    def update(self, time_chunk: slice, signal_chunk: np.ndarray):
+        """Update the statistics with a signal chunk. The mean and the sum of squared deviations of the signal are
+        combined with those of the chunk using the pairwise update formula, which is numerically stable also for long
+        integrations.
+
+        :param time_chunk: The slice of time indices of the chunk
+        :param signal_chunk: The signal chunk of shape (differential outputs, wavelengths, times)
+        """
+        number_of_time_steps_chunk = signal_chunk.shape[-1]
+        mean_chunk = np.mean(signal_chunk, axis=-1)
+        delta = mean_chunk - self._mean
+        number_of_time_steps = self.number_of_time_steps + number_of_time_steps_chunk
+
+        self._sum_of_squared_deviations += (np.sum((signal_chunk - mean_chunk[..., None]) ** 2, axis=-1)
+                                            + delta ** 2 * self.number_of_time_steps
+                                            * number_of_time_steps_chunk / number_of_time_steps)
+        self._mean += delta * number_of_time_steps_chunk / number_of_time_steps
+        self.number_of_time_steps = number_of_time_steps
+        self.observed[time_chunk] = True
+
+        for template_chunk in self._get_template_chunks(number_of_time_steps_chunk):
+            template_signals_chunk = self._template_bank.get_signals_chunk(template_chunk, time_chunk)
+            self._sum_of_products[template_chunk] += np.einsum('ijk, ...ijk->...ij', signal_chunk,
+                                                               template_signals_chunk)
+            self._sum_of_template_energies[template_chunk] += np.einsum('...ijk, ...ijk->...ij',
+                                                                        template_signals_chunk,
+                                                                        template_signals_chunk)
+
+    @property
+    def data_variance(self) -> np.ndarray:
+        """Return the variance of the signal observed so far.
+
+        :return: The data variance of shape (differential outputs, wavelengths)
+        """
+        return self._sum_of_squared_deviations / self.number_of_time_steps
+
+    @property
+    def is_data_variance_positive(self) -> bool:
+        """Return whether the variance of the signal observed so far is positive for all differential outputs and
+        wavelengths, which is required for the matrices B and C to be finite. This is not the case before at least two
+        time steps have been observed.
+
+        :return: Whether the data variance is positive
+        """
+        return self.number_of_time_steps > 1 and bool(np.all(self._sum_of_squared_deviations > 0))
+
+    @property
+    def matrix_b(self) -> np.ndarray:
+        """Return the diagonal elements of the matrix B of the signal observed so far.
+
+        :return: The diagonal elements of the matrix B of shape (x, y, differential outputs, wavelengths)
+        """
+        return (self._sum_of_template_energies / self.data_variance).reshape(self._grid_shape + self._mean.shape)
+
+    @property
+    def matrix_c(self) -> np.ndarray:
+        """Return the matrix C of the signal observed so far.
+
+        :return: The matrix C of shape (x, y, differential outputs, wavelengths)
+        """
+        return (self._sum_of_products / self.data_variance).reshape(self._grid_shape + self._mean.shape)
+
+    def get_cross_correlations(self, template_signal: np.ndarray, index_output: int) -> np.ndarray:
+        """Return the matrix C of a template signal of one differential output with all templates, restricted to the
+        times observed so far and normalized by the data variance.
+
+        :param template_signal: The template signal of shape (wavelengths, times)
+        :param index_output: The index of the differential output
+        :return: The cross-correlations of shape (x, y, wavelengths)
+        """
+        indices_observed = np.flatnonzero(self.observed)
+        cross_correlations = np.zeros((self._number_of_templates, self._number_of_wavelengths))
+
+        for template_chunk in self._get_template_chunks(len(indices_observed)):
+            template_signals_chunk = self._template_bank.get_signals_chunk(template_chunk, indices_observed)
+            cross_correlations[template_chunk] = np.einsum('jk, ...jk->...j', template_signal[:, indices_observed],
+                                                           template_signals_chunk[:, index_output])
+        return (cross_correlations / self.data_variance[index_output]).reshape(self._grid_shape
+                                                                               + (self._number_of_wavelengths,))
@@ -0,0 +1,126 @@
+from typing import Tuple
+
+import numpy as np
+from astropy import units as u
+
+from sygn.core.context import Context
+from sygn.core.entities.photon_sources.photon_source import PhotonSource
+from sygn.core.entities.photon_sources.planet import Planet
+from sygn.util.helpers import Coordinates
+
+
+class SimulationPlan():
+    """Class representing a simulation plan. All quantities that are required by the data generation are converted to
+    plain float64 arrays in canonical units once, such that the numerical kernels operate on raw arrays only. The
+    canonical units are meters for wavelengths, apertures and collector positions, microns for wavelength bin widths,
+    seconds for times, radians for sky coordinates and ph / (m^2 s um) for spectral flux densities.
+    """
+
+    def __init__(self, context: Context):
+        """The constructor method.
+
+        :param context: The context
+        """
+        instrument_parameters = context.observatory.instrument_parameters
+        beam_combination_scheme = context.observatory.beam_combination_scheme
+        noise_contributions = context.settings.noise_contributions
+
+        self.wavelengths = instrument_parameters.wavelength_bin_centers.to(u.m).value.astype(np.float64)
+        self.wavelength_bin_widths = instrument_parameters.wavelength_bin_widths.to(u.um).value.astype(np.float64)
+        self.aperture_radius = float(instrument_parameters.aperture_radius.to(u.m).value)
+        self.unperturbed_instrument_throughput = float(instrument_parameters.unperturbed_instrument_throughput)
+        self.time_range = context.time_range.to(u.s).value.astype(np.float64)
+        self.time_step = float(context.settings.time_step.to(u.s).value)
+        self.modulation_period = float(context.mission.modulation_period.to(u.s).value)
+        self.beam_combination_matrix = np.asarray(beam_combination_scheme.get_beam_combination_transfer_matrix(),
+                                                  dtype=np.complex128)
+        self.differential_output_pairs = beam_combination_scheme.get_differential_output_pairs()
+        self.number_of_inputs = beam_combination_scheme.number_of_inputs
+        self.number_of_outputs = beam_combination_scheme.number_of_outputs
+        self.planet_orbital_motion = context.settings.planet_orbital_motion
+        self.fiber_injection_variability = noise_contributions.fiber_injection_variability
+        self.optical_path_difference_variability_apply = noise_contributions.optical_path_difference_variability.apply
+        self.optical_path_difference_distribution = (
+            noise_contributions.optical_path_difference_distribution.to(u.m).value.astype(np.float64)
+            if self.optical_path_difference_variability_apply else None)
+        self.number_of_time_steps_planet_motion = len(context.time_range_planet_motion)
+        self.observatory_coordinates = self._get_observatory_coordinates(context)
+        self._static_sources = {}
+        self._point_sources = {}
+
+    def _get_observatory_coordinates(self, context: Context) -> Coordinates:
+        """Return the collector trajectories in units of meters for the full time range.
+
+        :param context: The context
+        :return: The x- and y-coordinates of the collectors, each of shape (times, inputs)
+        """
+        observatory_coordinates = context.observatory.array_configuration.get_collector_positions(context.time_range)
+        return Coordinates(observatory_coordinates.x.to(u.m).value.astype(np.float64),
+                           observatory_coordinates.y.to(u.m).value.astype(np.float64))
+
+    def _is_static(self, source: PhotonSource) -> bool:
+        """Return whether the sky coordinates and brightness distribution of a source are the same for all times. This
+        is the case for all sources but planets whose orbital motion is modeled.
+
+        :param source: The photon source
+        :return: Whether the source is static
+        """
+        return not (self.planet_orbital_motion and isinstance(source, Planet))
+
+    def _convert_source(self, source: PhotonSource, indices_time: list) -> Tuple[Coordinates, np.ndarray]:
+        """Return the flattened sky coordinates in units of radians and the flattened sky brightness distribution in
+        units of ph / (m^2 s um) of a source for the given time indices and all wavelengths.
+
+        :param source: The photon source
+        :param indices_time: The time indices
+        :return: A tuple containing the x- and y-sky coordinates and the sky brightness distribution, each of shape
+            (times, wavelengths, pixels)
+        """
+        sky_coordinates = [[source.get_sky_coordinates(index_time, index_wavelength) for index_wavelength in
+                            range(len(self.wavelengths))] for index_time in indices_time]
+        return (Coordinates(
+            np.array([[coordinates.x.to(u.rad).value.ravel() for coordinates in row] for row in sky_coordinates]),
+            np.array([[coordinates.y.to(u.rad).value.ravel() for coordinates in row] for row in sky_coordinates])),
+                np.array([[source.get_sky_brightness_distribution(index_time, index_wavelength).value.ravel() for
+                           index_wavelength in range(len(self.wavelengths))] for index_time in indices_time]))
+
+    def get_source_sky_coordinates_and_brightness(self,
+                                                  source: PhotonSource,
+                                                  indices_time: list) -> Tuple[Coordinates, np.ndarray]:
+        """Return the flattened sky coordinates in units of radians and the flattened sky brightness distribution in
+        units of ph / (m^2 s um) of a source for the given time indices and all wavelengths. Static sources are only
+        converted once and are returned with a time axis of length 1, which is broadcast over the time axis.
+
+        :param source: The photon source
+        :param indices_time: The time indices
+        :return: A tuple containing the x- and y-sky coordinates and the sky brightness distribution, each of shape
+            (times, wavelengths, pixels)
+        """
+        if not self._is_static(source):
+            return self._convert_source(source, indices_time)
+        if id(source) not in self._static_sources:
+            self._static_sources[id(source)] = self._convert_source(source, [0])
+        return self._static_sources[id(source)]
+
+    def get_point_source_sky_position(self, source: Planet, indices_time: list) -> Tuple[Coordinates, np.ndarray]:
+        """Return the sky coordinates in units of radians and the spectral flux density in units of ph / (m^2 s um) of
+        the single pixel containing a point source for the given time indices and all wavelengths. The positions are
+        converted once for all time steps of the planet motion.
+
+        :param source: The point source
+        :param indices_time: The time indices
+        :return: A tuple containing the x- and y-sky coordinates and the sky brightness distribution, each of shape
+            (times, wavelengths, 1)
+        """
+        if id(source) not in self._point_sources:
+            sky_positions = [[source.get_sky_position(index_time, index_wavelength) for index_wavelength in
+                              range(len(self.wavelengths))] for index_time in
+                             range(self.number_of_time_steps_planet_motion)]
+            self._point_sources[id(source)] = (
+                np.array([[[coordinates.x.to(u.rad).value] for coordinates, _ in row] for row in sky_positions]),
+                np.array([[[coordinates.y.to(u.rad).value] for coordinates, _ in row] for row in sky_positions]),
+                np.array([[[spectral_flux_density.value] for _, spectral_flux_density in row] for row in
+                          sky_positions]))
+        sky_coordinates_x, sky_coordinates_y, sky_brightness_distribution = self._point_sources[id(source)]
+        return (Coordinates(sky_coordinates_x[indices_time], sky_coordinates_y[indices_time]),
+                sky_brightness_distribution[indices_time])
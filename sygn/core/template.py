@@ -1,3 +1,29 @@
+import astropy
+import numpy as np
+
+from sygn.util.helpers import Coordinates
+
+
+def _get_signals_at_times(coefficients: np.ndarray,
+                          frequency_indices: np.ndarray,
+                          weights: np.ndarray,
+                          number_of_time_steps: int,
+                          time_indices) -> np.ndarray:
+    """Return the signals in the time domain corresponding to Fourier coefficients of the real FFT at the stored
+    frequencies, evaluated only at the given time indices, i.e. the values of the inverse real FFT at these times.
+
+    :param coefficients: The Fourier coefficients of shape (..., frequencies)
+    :param frequency_indices: The indices of the stored frequencies of the real FFT of the signals
+    :param weights: The weights of the stored frequencies in Parseval's theorem of shape (frequencies)
+    :param number_of_time_steps: The number of time steps of the signals
+    :param time_indices: The slice or array of time indices
+    :return: The signals of shape (..., times)
+    """
+    times = np.arange(number_of_time_steps)[time_indices]
+    phasors = np.exp(2j * np.pi * np.multiply.outer(frequency_indices, times) / number_of_time_steps)
+    return np.real((coefficients * weights) @ phasors) / number_of_time_steps
+
+
 class Template():
     """Class representation of a signal template.
     """
@@ -7,5 +33,526 @@ class Template():
         """
         self.signal = signal
         self.effective_area_rms = effective_area_rms
-        self.index_x = None
-        self.index_y = None
+        self.index_x = index_x
+        self.index_y = index_y
+
+
+class TemplateBank():
+    """Class representation of a bank of signal templates. The signals and effective areas RMS of all templates are
+    stored in one contiguous array each, such that they can be processed at once. Indexing the bank with a pair of
+    indices returns the corresponding template.
+    """
+
+    def __init__(self, signals: np.ndarray, effective_areas_rms: astropy.units.Quantity):
+        """Constructor method.
+
+        :param signals: The template signals of shape (x, y, differential outputs, wavelengths, times)
+        :param effective_areas_rms: The effective areas RMS of shape (x, y, differential outputs, wavelengths)
+        """
+        self.signals = signals
+        self.effective_areas_rms = effective_areas_rms
+        self.indices_x, self.indices_y = np.meshgrid(range(signals.shape[0]), range(signals.shape[1]), indexing='ij')
+
+    @staticmethod
+    def from_differential_photon_counts(differential_photon_counts: np.ndarray,
+                                        differential_effective_areas: astropy.units.Quantity) -> 'TemplateBank':
+        """Return the template bank corresponding to the differential photon counts and effective areas of a planet at
+        each position of a grid. The template signals are normalized to unit RMS for each wavelength.
+
+        :param differential_photon_counts: The differential photon counts of shape (x, y, differential outputs,
+            wavelengths, times)
+        :param differential_effective_areas: The differential effective areas of shape (x, y, differential outputs,
+            wavelengths, times)
+        :return: The template bank
+        """
+        normalization = np.sqrt(np.mean(differential_photon_counts ** 2, axis=-1))
+        signals = np.einsum('xyijk, xyij->xyijk', differential_photon_counts, 1 / normalization)
+        effective_areas_rms = (np.sqrt(np.mean(np.array(differential_effective_areas) ** 2, axis=-1))
+                               * differential_effective_areas.unit)
+        return TemplateBank(signals, effective_areas_rms)
+
+    def get_signals_chunk(self, template_chunk: slice, time_indices) -> np.ndarray:
+        """Return the signals of a chunk of templates at the given time indices. The templates are indexed in the
+        flattened order of the grid, such that a bank can be processed chunk by chunk without reading all signals.
+
+        :param template_chunk: The slice of flattened template indices
+        :param time_indices: The slice or array of time indices
+        :return: The template signals of shape (templates, differential outputs, wavelengths, times)
+        """
+        signals = self.signals.reshape((-1,) + self.signals.shape[2:])
+        return np.asarray(signals[template_chunk][..., time_indices], dtype=float)
+
+    def __getitem__(self, indices: tuple) -> Template:
+        """Return the template at the given pair of indices.
+
+        :param indices: The x- and y-index of the template
+        :return: The template
+        """
+        index_x, index_y = indices
+        return Template(self.signals[index_x, index_y],
+                        self.effective_areas_rms[index_x, index_y],
+                        self.indices_x[index_x, index_y],
+                        self.indices_y[index_x, index_y])
+
+    def __len__(self) -> int:
+        """Return the number of templates along the x-axis.
+
+        :return: The number of templates along the x-axis
+        """
+        return self.signals.shape[0]
+
+    @property
+    def shape(self) -> tuple:
+        """Return the shape of the grid of templates.
+
+        :return: The shape of the grid of templates
+        """
+        return self.signals.shape[:2]
+
+
+class HarmonicTemplateBank(TemplateBank):
+    """Class representation of a bank of signal templates that are stored in the harmonic domain. Since the templates
+    are modulated by the rotation of the array, their power is concentrated in a small number of harmonics of the
+    rotation frequency. Only the Fourier coefficients along the time axis at the frequencies that carry the most power
+    across the bank are stored, which are the same for all templates.
+    """
+
+    def __init__(self,
+                 coefficients: np.ndarray,
+                 frequency_indices: np.ndarray,
+                 number_of_time_steps: int,
+                 effective_areas_rms: astropy.units.Quantity):
+        """Constructor method.
+
+        :param coefficients: The Fourier coefficients of shape (x, y, differential outputs, wavelengths, harmonics)
+        :param frequency_indices: The indices of the stored frequencies of the real FFT of the signals
+        :param number_of_time_steps: The number of time steps of the signals
+        :param effective_areas_rms: The effective areas RMS of shape (x, y, differential outputs, wavelengths)
+        """
+        self.coefficients = coefficients
+        self.frequency_indices = frequency_indices
+        self.number_of_time_steps = number_of_time_steps
+        self.effective_areas_rms = effective_areas_rms
+        self.indices_x, self.indices_y = np.meshgrid(range(coefficients.shape[0]), range(coefficients.shape[1]),
+                                                     indexing='ij')
+
+    @staticmethod
+    def from_template_bank(template_bank: TemplateBank, number_of_harmonics: int) -> 'HarmonicTemplateBank':
+        """Return the harmonic representation of a template bank, keeping the given number of frequencies that carry the
+        most power summed over all templates, differential outputs and wavelengths.
+
+        :param template_bank: The template bank
+        :param number_of_harmonics: The number of stored frequencies
+        :return: The harmonic template bank
+        """
+        number_of_time_steps = template_bank.signals.shape[-1]
+        coefficients = np.fft.rfft(template_bank.signals, axis=-1)
+        power = np.nansum(abs(coefficients) ** 2, axis=tuple(range(coefficients.ndim - 1)))
+        frequency_indices = np.sort(np.argsort(power, kind='stable')[::-1][:number_of_harmonics])
+        return HarmonicTemplateBank(coefficients[..., frequency_indices],
+                                    frequency_indices,
+                                    number_of_time_steps,
+                                    template_bank.effective_areas_rms)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Return the weights of the stored frequencies in Parseval's theorem for the real FFT, i.e. 1 for the constant
+        term and the Nyquist frequency and 2 for all other frequencies, whose negative counterparts are not stored.
+
+        :return: The weights of shape (harmonics)
+        """
+        is_unpaired = (self.frequency_indices == 0) | (2 * self.frequency_indices == self.number_of_time_steps)
+        return np.where(is_unpaired, 1, 2)
+
+    def _get_signals(self, coefficients: np.ndarray) -> np.ndarray:
+        """Return the signals in the time domain corresponding to the given Fourier coefficients.
+
+        :param coefficients: The Fourier coefficients of shape (..., harmonics)
+        :return: The signals of shape (..., times)
+        """
+        spectrum = np.zeros(coefficients.shape[:-1] + (self.number_of_time_steps // 2 + 1,), dtype=complex)
+        spectrum[..., self.frequency_indices] = coefficients
+        return np.fft.irfft(spectrum, n=self.number_of_time_steps, axis=-1)
+
+    @property
+    def signals(self) -> np.ndarray:
+        """Return the template signals in the time domain.
+
+        :return: The template signals of shape (x, y, differential outputs, wavelengths, times)
+        """
+        return self._get_signals(self.coefficients)
+
+    def get_signals_chunk(self, template_chunk: slice, time_indices) -> np.ndarray:
+        """Return the signals in the time domain of a chunk of templates, indexed in the flattened order of the grid,
+        evaluated only at the given time indices.
+
+        :param template_chunk: The slice of flattened template indices
+        :param time_indices: The slice or array of time indices
+        :return: The template signals of shape (templates, differential outputs, wavelengths, times)
+        """
+        coefficients = self.coefficients.reshape((-1,) + self.coefficients.shape[2:])[template_chunk]
+        return _get_signals_at_times(coefficients, self.frequency_indices, self.weights, self.number_of_time_steps,
+                                     time_indices)
+
+    def __getitem__(self, indices: tuple) -> Template:
+        """Return the template at the given pair of indices with its signal in the time domain.
+
+        :param indices: The x- and y-index of the template
+        :return: The template
+        """
+        index_x, index_y = indices
+        return Template(self._get_signals(self.coefficients[index_x, index_y]),
+                        self.effective_areas_rms[index_x, index_y],
+                        self.indices_x[index_x, index_y],
+                        self.indices_y[index_x, index_y])
+
+    def __len__(self) -> int:
+        """Return the number of templates along the x-axis.
+
+        :return: The number of templates along the x-axis
+        """
+        return self.coefficients.shape[0]
+
+    @property
+    def shape(self) -> tuple:
+        """Return the shape of the grid of templates.
+
+        :return: The shape of the grid of templates
+        """
+        return self.coefficients.shape[:2]
+
+
+class CompressedTemplateBank(TemplateBank):
+    """Class representation of a bank of signal templates that is compressed by a truncated singular value
+    decomposition. Since neighbouring templates are highly correlated, the spectral-temporal signals of all templates
+    of a differential output are well approximated by linear combinations of a small number of shared basis signals.
+    Only the basis signals and the coefficients of each template are stored.
+    """
+
+    def __init__(self,
+                 basis: np.ndarray,
+                 coefficients: np.ndarray,
+                 undefined: np.ndarray,
+                 effective_areas_rms: astropy.units.Quantity,
+                 approximation_error: np.ndarray):
+        """Constructor method.
+
+        :param basis: The orthonormal basis signals of shape (differential outputs, rank, wavelengths, times)
+        :param coefficients: The coefficients of the templates of shape (x, y, differential outputs, rank)
+        :param undefined: Whether the template signals are undefined, i.e. NaN, of shape (x, y, differential outputs,
+            wavelengths)
+        :param effective_areas_rms: The effective areas RMS of shape (x, y, differential outputs, wavelengths)
+        :param approximation_error: The relative approximation error of the template signals, i.e. the Frobenius norm
+            of the residuals divided by the Frobenius norm of the signals, of shape (differential outputs)
+        """
+        self.basis = basis
+        self.coefficients = coefficients
+        self.undefined = undefined
+        self.effective_areas_rms = effective_areas_rms
+        self.approximation_error = approximation_error
+        self.indices_x, self.indices_y = np.meshgrid(range(coefficients.shape[0]), range(coefficients.shape[1]),
+                                                     indexing='ij')
+
+    @staticmethod
+    def from_template_bank(template_bank: TemplateBank, tolerance: float) -> 'CompressedTemplateBank':
+        """Return the compressed representation of a template bank. The rank is the smallest rank for which the
+        fraction of the energy of the template signals that is not captured by the basis does not exceed the tolerance
+        for any differential output, or the full rank if no rank meets the tolerance. Undefined template signals are set
+        to zero for the decomposition and are restored when the signals are reconstructed.
+
+        :param template_bank: The template bank
+        :param tolerance: The maximum fraction of the energy of the template signals that is discarded
+        :return: The compressed template bank
+        """
+        signals = np.asarray(template_bank.signals)
+        grid_shape = signals.shape[:2]
+        number_of_outputs, number_of_wavelengths, number_of_time_steps = signals.shape[2:]
+        undefined = np.isnan(signals).any(axis=-1)
+
+        # Decompose the matrix of shape (templates, wavelengths * times) of each differential output
+        matrices = np.moveaxis(np.nan_to_num(signals, nan=0).reshape((-1,) + signals.shape[2:]), 1, 0).reshape(
+            number_of_outputs, -1, number_of_wavelengths * number_of_time_steps)
+        left_singular_vectors, singular_values, right_singular_vectors = np.linalg.svd(matrices, full_matrices=False)
+
+        energy = singular_values ** 2
+        total_energy = np.sum(energy, axis=-1, keepdims=True)
+        discarded_energy = 1 - np.cumsum(energy, axis=-1) / np.where(total_energy > 0, total_energy, 1)
+
+        # Use the full rank for differential outputs for which no rank meets the tolerance, e.g. due to round-off
+        rank = 1
+        for discarded_energy_output in discarded_energy:
+            ranks_within_tolerance = np.flatnonzero(discarded_energy_output <= tolerance) + 1
+            rank = max(rank, ranks_within_tolerance[0] if len(ranks_within_tolerance) else len(discarded_energy_output))
+
+        basis = right_singular_vectors[:, :rank].reshape(number_of_outputs, rank, number_of_wavelengths,
+                                                         number_of_time_steps)
+        coefficients = np.moveaxis((left_singular_vectors[:, :, :rank] * singular_values[:, None, :rank]), 0, 1)
+        approximation_error = np.sqrt(np.clip(discarded_energy[:, rank - 1], 0, None))
+        return CompressedTemplateBank(basis,
+                                      coefficients.reshape(grid_shape + (number_of_outputs, rank)),
+                                      undefined,
+                                      template_bank.effective_areas_rms,
+                                      approximation_error)
+
+    def _get_signals(self, coefficients: np.ndarray, undefined: np.ndarray) -> np.ndarray:
+        """Return the signals corresponding to the given coefficients.
+
+        :param coefficients: The coefficients of shape (..., differential outputs, rank)
+        :param undefined: Whether the signals are undefined of shape (..., differential outputs, wavelengths)
+        :return: The signals of shape (..., differential outputs, wavelengths, times)
+        """
+        signals = np.einsum('...ir, irjk->...ijk', coefficients, self.basis)
+        signals[undefined] = np.nan
+        return signals
+
+    @property
+    def signals(self) -> np.ndarray:
+        """Return the approximated template signals.
+
+        :return: The template signals of shape (x, y, differential outputs, wavelengths, times)
+        """
+        return self._get_signals(self.coefficients, self.undefined)
+
+    def get_signals_chunk(self, template_chunk: slice, time_indices) -> np.ndarray:
+        """Return the approximated signals of a chunk of templates, indexed in the flattened order of the grid, at the
+        given time indices.
+
+        :param template_chunk: The slice of flattened template indices
+        :param time_indices: The slice or array of time indices
+        :return: The template signals of shape (templates, differential outputs, wavelengths, times)
+        """
+        coefficients = self.coefficients.reshape((-1,) + self.coefficients.shape[2:])[template_chunk]
+        undefined = self.undefined.reshape((-1,) + self.undefined.shape[2:])[template_chunk]
+        signals = np.einsum('tir, irjk->tijk', coefficients, self.basis[..., time_indices])
+        signals[undefined] = np.nan
+        return signals
+
+    def __getitem__(self, indices: tuple) -> Template:
+        """Return the template at the given pair of indices with its approximated signal.
+
+        :param indices: The x- and y-index of the template
+        :return: The template
+        """
+        index_x, index_y = indices
+        return Template(self._get_signals(self.coefficients[index_x, index_y], self.undefined[index_x, index_y]),
+                        self.effective_areas_rms[index_x, index_y],
+                        self.indices_x[index_x, index_y],
+                        self.indices_y[index_x, index_y])
+
+    def __len__(self) -> int:
+        """Return the number of templates along the x-axis.
+
+        :return: The number of templates along the x-axis
+        """
+        return self.coefficients.shape[0]
+
+    @property
+    def shape(self) -> tuple:
+        """Return the shape of the grid of templates.
+
+        :return: The shape of the grid of templates
+        """
+        return self.coefficients.shape[:2]
+
+
+class PolarTemplateBank(TemplateBank):
+    """Class representation of a bank of signal templates on a polar grid of planet positions for circularly rotating
+    arrays. Since a planet at azimuth phi produces the same signal as a planet at azimuth 0, delayed by phi / omega,
+    where omega is the angular velocity of the array rotation, only the templates along the radial cut at azimuth 0
+    are stored. They are stored as their Fourier coefficients along the time axis, such that the template at any
+    azimuth is obtained by a phase rotation. Indexing the bank with a pair of indices (radius, azimuth) returns the
+    corresponding template.
+    """
+
+    def __init__(self,
+                 coefficients: np.ndarray,
+                 frequency_indices: np.ndarray,
+                 number_of_time_steps: int,
+                 effective_areas_rms: astropy.units.Quantity,
+                 radii: astropy.units.Quantity,
+                 azimuths: astropy.units.Quantity,
+                 time_shifts: np.ndarray):
+        """Constructor method.
+
+        :param coefficients: The Fourier coefficients of the templates along the radial cut of shape (radii,
+            differential outputs, wavelengths, frequencies)
+        :param frequency_indices: The indices of the stored frequencies of the real FFT of the signals
+        :param number_of_time_steps: The number of time steps of the signals
+        :param effective_areas_rms: The effective areas RMS along the radial cut of shape (radii, differential outputs,
+            wavelengths), which do not depend on the azimuth
+        :param radii: The radii of the polar grid
+        :param azimuths: The azimuths of the polar grid
+        :param time_shifts: The time shifts corresponding to the azimuths in units of time steps
+        """
+        self.coefficients = coefficients
+        self.frequency_indices = frequency_indices
+        self.number_of_time_steps = number_of_time_steps
+        self.radii = radii
+        self.azimuths = azimuths
+        self.time_shifts = time_shifts
+        self.effective_areas_rms = np.broadcast_to(effective_areas_rms[:, None],
+                                                   (len(radii), len(azimuths)) + effective_areas_rms.shape[1:],
+                                                   subok=True)
+        self.indices_x, self.indices_y = np.meshgrid(range(len(radii)), range(len(azimuths)), indexing='ij')
+
+    @staticmethod
+    def from_differential_photon_counts(differential_photon_counts: np.ndarray,
+                                        differential_effective_areas: astropy.units.Quantity,
+                                        radii: astropy.units.Quantity,
+                                        azimuths: astropy.units.Quantity,
+                                        time_shifts: np.ndarray,
+                                        number_of_harmonics: int = None) -> 'PolarTemplateBank':
+        """Return the polar template bank corresponding to the differential photon counts and effective areas of a
+        planet along the radial cut. The template signals are normalized to unit RMS for each wavelength. If a number of
+        harmonics is given, only the frequencies that carry the most power summed over all templates, differential
+        outputs and wavelengths are stored, otherwise all frequencies are stored and the templates are exact.
+
+        :param differential_photon_counts: The differential photon counts of shape (radii, differential outputs,
+            wavelengths, times)
+        :param differential_effective_areas: The differential effective areas of shape (radii, differential outputs,
+            wavelengths, times)
+        :param radii: The radii of the polar grid
+        :param azimuths: The azimuths of the polar grid
+        :param time_shifts: The time shifts corresponding to the azimuths in units of time steps
+        :param number_of_harmonics: The number of stored frequencies. If None, all frequencies are stored
+        :return: The polar template bank
+        """
+        template_bank = TemplateBank.from_differential_photon_counts(differential_photon_counts[:, None],
+                                                                     differential_effective_areas[:, None])
+        number_of_time_steps = differential_photon_counts.shape[-1]
+        coefficients = np.fft.rfft(template_bank.signals[:, 0], axis=-1)
+        frequency_indices = np.arange(coefficients.shape[-1])
+        if number_of_harmonics:
+            power = np.nansum(abs(coefficients) ** 2, axis=tuple(range(coefficients.ndim - 1)))
+            frequency_indices = np.sort(np.argsort(power, kind='stable')[::-1][:number_of_harmonics])
+        return PolarTemplateBank(coefficients[..., frequency_indices],
+                                 frequency_indices,
+                                 number_of_time_steps,
+                                 template_bank.effective_areas_rms[:, 0],
+                                 radii,
+                                 azimuths,
+                                 time_shifts)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Return the weights of the stored frequencies in Parseval's theorem for the real FFT, i.e. 1 for the constant
+        term and the Nyquist frequency and 2 for all other frequencies, whose negative counterparts are not stored.
+
+        :return: The weights of shape (frequencies)
+        """
+        is_unpaired = (self.frequency_indices == 0) | (2 * self.frequency_indices == self.number_of_time_steps)
+        return np.where(is_unpaired, 1, 2)
+
+    def _get_signals(self, coefficients: np.ndarray, time_shifts: np.ndarray) -> np.ndarray:
+        """Return the signals in the time domain corresponding to the given Fourier coefficients, delayed by the given
+        time shifts.
+
+        :param coefficients: The Fourier coefficients of shape (..., frequencies)
+        :param time_shifts: The time shifts in units of time steps of shape (...)
+        :return: The signals of shape (..., times)
+        """
+        phase_rotation = np.exp(-2j * np.pi * np.multiply.outer(time_shifts, self.frequency_indices)
+                                / self.number_of_time_steps)
+        coefficients = coefficients * phase_rotation
+        spectrum = np.zeros(coefficients.shape[:-1] + (self.number_of_time_steps // 2 + 1,), dtype=complex)
+        spectrum[..., self.frequency_indices] = coefficients
+        return np.fft.irfft(spectrum, n=self.number_of_time_steps, axis=-1)
+
+    @property
+    def signals(self) -> np.ndarray:
+        """Return the template signals in the time domain at all positions of the polar grid.
+
+        :return: The template signals of shape (radii, azimuths, differential outputs, wavelengths, times)
+        """
+        return self._get_signals(self.coefficients[:, None], self.time_shifts[None, :, None, None])
+
+    def get_sky_coordinates(self) -> Coordinates:
+        """Return the sky coordinates of the positions of the polar grid.
+
+        :return: The x- and y-sky coordinates, each of shape (radii, azimuths)
+        """
+        return Coordinates(np.outer(self.radii, np.cos(self.azimuths)),
+                           np.outer(self.radii, np.sin(self.azimuths)))
+
+    def get_correlations(self, signal_coefficients: np.ndarray) -> np.ndarray:
+        """Return the sums over time of the products of signals, given by their Fourier coefficients at the stored
+        frequencies, with the templates along the radial cut delayed by the time shifts of all azimuths. The sums are
+        the circular cross-correlations of the signals and the templates evaluated at the time shifts. If all time
+        shifts are integer numbers of time steps, the cross-correlations at all time shifts are calculated at once by an
+        inverse FFT of the cross-spectra, otherwise they are evaluated at the time shifts directly.
+
+        :param signal_coefficients: The Fourier coefficients of the signals of shape (..., differential outputs,
+            wavelengths, frequencies)
+        :return: The sums of shape (..., radii, azimuths, differential outputs, wavelengths)
+        """
+        cross_spectra = np.expand_dims(signal_coefficients, -4) * np.conj(self.coefficients)
+
+        if np.allclose(self.time_shifts, np.round(self.time_shifts), rtol=0, atol=1e-9):
+            spectrum = np.zeros(cross_spectra.shape[:-1] + (self.number_of_time_steps // 2 + 1,), dtype=complex)
+            spectrum[..., self.frequency_indices] = cross_spectra
+            cross_correlations = np.fft.irfft(spectrum, n=self.number_of_time_steps, axis=-1)
+            cross_correlations = cross_correlations[..., np.round(self.time_shifts).astype(int)
+                                                    % self.number_of_time_steps]
+        else:
+            phase_rotation = np.exp(2j * np.pi * np.multiply.outer(self.frequency_indices, self.time_shifts)
+                                    / self.number_of_time_steps)
+            cross_correlations = np.real((cross_spectra * self.weights) @ phase_rotation) / self.number_of_time_steps
+        return np.moveaxis(cross_correlations, -1, -3)
+
+    def get_template_energies(self) -> np.ndarray:
+        """Return the sums over time of the squared templates. A delay does not change the energy of a periodic signal,
+        except for the Nyquist frequency, whose delayed coefficient is not real for time shifts that are not integer
+        numbers of time steps and of which only the real part is represented in the time domain.
+
+        :return: The sums of shape (radii, azimuths, differential outputs, wavelengths)
+        """
+        phase_rotation = np.exp(-2j * np.pi * np.multiply.outer(self.time_shifts, self.frequency_indices)
+                                / self.number_of_time_steps)
+        is_nyquist = 2 * self.frequency_indices == self.number_of_time_steps
+        factors = np.where(is_nyquist, np.real(phase_rotation) ** 2, 1)
+        energies = np.einsum('rijf, af->raij', self.weights * abs(self.coefficients) ** 2, factors)
+        return energies / self.number_of_time_steps
+
+    def get_signals_chunk(self, template_chunk: slice, time_indices) -> np.ndarray:
+        """Return the signals in the time domain of a chunk of templates, indexed in the flattened order of the polar
+        grid, evaluated only at the given time indices.
+
+        :param template_chunk: The slice of flattened template indices
+        :param time_indices: The slice or array of time indices
+        :return: The template signals of shape (templates, differential outputs, wavelengths, times)
+        """
+        indices_radius, indices_azimuth = np.unravel_index(np.arange(np.prod(self.shape))[template_chunk], self.shape)
+        phase_rotation = np.exp(-2j * np.pi * np.multiply.outer(self.time_shifts[indices_azimuth],
+                                                                self.frequency_indices) / self.number_of_time_steps)
+        return _get_signals_at_times(self.coefficients[indices_radius] * phase_rotation[:, None, None],
+                                     self.frequency_indices,
+                                     self.weights,
+                                     self.number_of_time_steps,
+                                     time_indices)
+
+    def __getitem__(self, indices: tuple) -> Template:
+        """Return the template at the given pair of indices (radius, azimuth) with its signal in the time domain.
+
+        :param indices: The radius and azimuth index of the template
+        :return: The template
+        """
+        index_radius, index_azimuth = indices
+        return Template(self._get_signals(self.coefficients[index_radius], self.time_shifts[index_azimuth]),
+                        self.effective_areas_rms[index_radius, index_azimuth],
+                        self.indices_x[index_radius, index_azimuth],
+                        self.indices_y[index_radius, index_azimuth])
+
+    def __len__(self) -> int:
+        """Return the number of radii.
+
+        :return: The number of radii
+        """
+        return len(self.radii)
+
+    @property
+    def shape(self) -> tuple:
+        """Return the shape of the polar grid of templates.
+
+        :return: The shape of the polar grid of templates
+        """
+        return len(self.radii), len(self.azimuths)
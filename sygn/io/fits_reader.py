@@ -1,11 +1,12 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Tuple
 
 import numpy as np
 from astropy import units as u
 from astropy.io import fits
 
 from sygn.core.context import Context
+from sygn.core.template import CompressedTemplateBank, HarmonicTemplateBank, TemplateBank
 
 
 class FITSReader():
@@ -194,3 +195,64 @@ class FITSReader():
             header = hdul[0].header
             data, effective_area = FITSReader._extract_data(data=hdul[1:])
         return data, header, effective_area
+
+    @staticmethod
+    def read_fits_chunks(input_path: Path, number_of_time_steps_per_chunk: int) -> Iterator[Tuple[slice, np.ndarray]]:
+        """Read the photon count data from the FITS file in chunks along the time axis. The file is memory-mapped, such
+        that only the current chunk is read from disk.
+
+        :param input_path: The input path of the FITS file
+        :param number_of_time_steps_per_chunk: The number of time steps per chunk
+        :return: An iterator over tuples containing the slice of time indices and the data of shape (differential
+            outputs, wavelengths, times) of each chunk
+        """
+        with fits.open(input_path, memmap=True) as hdul:
+            images = [hdu for hdu in hdul[1:] if isinstance(hdu, fits.ImageHDU)]
+            number_of_time_steps = images[0].shape[-1]
+
+            for index_time in range(0, number_of_time_steps, number_of_time_steps_per_chunk):
+                time_chunk = slice(index_time, min(index_time + number_of_time_steps_per_chunk, number_of_time_steps))
+                yield time_chunk, np.array([image.data[:, time_chunk] for image in images], dtype=float)
+
+    @staticmethod
+    def _read_template_bank_signals(hdul: fits.HDUList) -> TemplateBank:
+        """Return the template bank without effective areas RMS from the HDUs storing its signals. Compressed and
+        harmonic template banks are rebuilt from their stored coefficients, while the signals of template banks in the
+        time domain are memory-mapped.
+
+        :param hdul: The HDU list of the template bank file
+        :return: The template bank
+        """
+        representation = hdul[0].header.get('SYGN_TEMPLATE_BANK_REPRESENTATION', 'time')
+        if representation == 'compressed':
+            return CompressedTemplateBank(np.array(hdul['BASIS'].data),
+                                          np.array(hdul['COEFFICIENTS'].data),
+                                          np.array(hdul['UNDEFINED'].data, dtype=bool),
+                                          None,
+                                          np.array(hdul['APPROXIMATION_ERROR'].data))
+        if representation == 'harmonic':
+            return HarmonicTemplateBank(np.array(hdul['COEFFICIENTS_REAL'].data)
+                                        + 1j * np.array(hdul['COEFFICIENTS_IMAG'].data),
+                                        np.array(hdul['FREQUENCY_INDICES'].data),
+                                        hdul[0].header['SYGN_TEMPLATE_BANK_TIME_STEPS'],
+                                        None)
+        return TemplateBank(hdul['TEMPLATES'].data, None)
+
+    @staticmethod
+    def read_template_bank(input_path: Path) -> Tuple[TemplateBank, fits.header.Header]:
+        """Read a template bank that has been written to a single FITS file. The template signals are memory-mapped,
+        such that opening the file does not depend on its size and only the parts of the signals that are accessed are
+        read from disk. Compressed and harmonic template banks are rebuilt from their stored coefficients.
+
+        :param input_path: The input path of the FITS file
+        :return: A tuple containing the template bank and the header
+        """
+        with fits.open(input_path, memmap=True) as hdul:
+            header = hdul[0].header
+            template_bank = FITSReader._read_template_bank_signals(hdul)
+            effective_area_table = hdul['EFFECTIVE_AREA_RMS'].data
+            effective_areas_rms = np.zeros(template_bank.shape + effective_area_table['effective_area_rms'].shape[1:])
+            effective_areas_rms[effective_area_table['index_x'], effective_area_table['index_y']] = \
+                effective_area_table['effective_area_rms']
+        template_bank.effective_areas_rms = effective_areas_rms * u.m ** 2
+        return template_bank, header
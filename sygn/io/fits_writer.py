@@ -1,14 +1,15 @@
-import os
 from datetime import datetime
-from itertools import product
 from pathlib import Path
 
+import numpy as np
+from astropy import units as u
 from astropy.io import fits
 
 from sygn.core.context import Context
 from sygn.core.entities.photon_sources.exozodi import Exozodi
 from sygn.core.entities.photon_sources.local_zodi import LocalZodi
 from sygn.core.entities.photon_sources.planet import Planet
+from sygn.core.template import CompressedTemplateBank, HarmonicTemplateBank, PolarTemplateBank, TemplateBank
 from sygn.util.helpers import FITSReadWriteType
 
 
@@ -24,7 +25,8 @@ class FITSWriter():
         :param primary: The primary HDU object
         :param context: The contexts object
         :param data_type: The data type to be written to FITS
-        :param index_template: The index of the template
+        :param index_x: The x-index of a single template. If None, no template indices are written
+        :param index_y: The y-index of a single template. If None, no template indices are written
         :return: The header
         """
         header = primary.header
@@ -96,7 +98,8 @@ class FITSWriter():
             header[
                 'HIERARCH SYGN_UNPERTURBED_INSTRUMENT_THROUGHPUT'] = context.observatory.instrument_parameters.unperturbed_instrument_throughput
 
-        if data_type == FITSReadWriteType.Template:
+        # Template bank files store the indices of all templates in a table instead of the header
+        if data_type == FITSReadWriteType.Template and index_x is not None and index_y is not None:
             header[f'HIERARCH SYGN_INDEX_X'] = index_x
             header[f'HIERARCH SYGN_INDEX_Y'] = index_y
         return header
@@ -120,26 +123,68 @@ class FITSWriter():
             hdul = fits.HDUList(hdu_list)
             hdul.writeto(output_path.joinpath(f'data_{datetime.now().strftime("%Y%m%d_%H%M%S.%f")}.fits'))
         elif data_type == FITSReadWriteType.Template:
-            # Create folder
-            folder_name = f'templates_{datetime.now().strftime("%Y%m%d_%H%M%S.%f")}'
-            os.makedirs(output_path.joinpath(folder_name))
-
-            for index_x, index_y in product(range(context.settings.grid_size),
-                                            range(context.settings.grid_size)):
-                template = context.templates[index_x, index_y]
-                header = FITSWriter._get_fits_header(primary, context, data_type, index_x, index_y)
-                hdu_list = []
-                hdu_list.append(primary)
-                # Add template data
-                for data_per_output in template.signal:
-                    hdu = fits.ImageHDU(data_per_output)
-                    hdu_list.append(hdu)
-                # Add effective areas rms
-                for area_per_output in template.effective_area_rms:
-                    # table = Table([np.rec.array(area_per_output)], names=['effective_area_rms'], dtype=['float64'])
-                    hdu = fits.BinTableHDU.from_columns(
-                        [fits.Column(name='effective_area_rms', array=area_per_output, format='D')])
-                    hdu_list.append(hdu)
-                hdul = fits.HDUList(hdu_list)
-                hdul.writeto(output_path.joinpath(folder_name).joinpath(
-                    f'template_{datetime.now().strftime("%Y%m%d_%H%M%S.%f")}_{index_x}_{index_y}.fits'))
+            FITSWriter._write_template_bank(output_path, context, primary)
+
+    @staticmethod
+    def _get_template_bank_hdus(template_bank: TemplateBank) -> list:
+        """Return the HDUs storing the signals of a template bank in its own representation, such that compressed and
+        harmonic template banks are not expanded to the time domain before they are written. Since FITS images can not
+        be complex, the Fourier coefficients of harmonic template banks are stored as their real and imaginary parts.
+
+        :param template_bank: The template bank
+        :return: The HDUs
+        """
+        if isinstance(template_bank, CompressedTemplateBank):
+            return [fits.ImageHDU(np.asarray(template_bank.basis, dtype=np.float64), name='BASIS'),
+                    fits.ImageHDU(np.asarray(template_bank.coefficients, dtype=np.float64), name='COEFFICIENTS'),
+                    fits.ImageHDU(np.asarray(template_bank.undefined, dtype=np.uint8), name='UNDEFINED'),
+                    fits.ImageHDU(np.asarray(template_bank.approximation_error, dtype=np.float64),
+                                  name='APPROXIMATION_ERROR')]
+        if isinstance(template_bank, HarmonicTemplateBank):
+            return [fits.ImageHDU(np.real(template_bank.coefficients).astype(np.float64), name='COEFFICIENTS_REAL'),
+                    fits.ImageHDU(np.imag(template_bank.coefficients).astype(np.float64), name='COEFFICIENTS_IMAG'),
+                    fits.ImageHDU(np.asarray(template_bank.frequency_indices, dtype=np.int64),
+                                  name='FREQUENCY_INDICES')]
+        return [fits.ImageHDU(np.asarray(template_bank.signals, dtype=np.float64), name='TEMPLATES')]
+
+    @staticmethod
+    def _write_template_bank(output_path: Path, context: Context, primary: fits.PrimaryHDU):
+        """Write all templates to a single FITS file. The template signals are stored as one contiguous image of shape
+        (grid size, grid size, differential outputs, wavelengths, times), or, for compressed and harmonic template
+        banks, as the images of their basis signals and coefficients or their Fourier coefficients. The effective areas
+        RMS are stored as a table with one row per template, such that the file only contains a single header and can
+        be memory-mapped when it is read.
+
+        :param output_path: The output path of the FITS file
+        :param context: The context
+        :param primary: The primary HDU object
+        """
+        if isinstance(context.templates, PolarTemplateBank):
+            raise TypeError('Polar template banks can not be written to a template bank file, since the file does not '
+                            'store the positions of the templates')
+
+        FITSWriter._get_fits_header(primary, context, FITSReadWriteType.Template)
+        primary.header['HIERARCH SYGN_TEMPLATE_BANK'] = True
+        if isinstance(context.templates, CompressedTemplateBank):
+            primary.header['HIERARCH SYGN_TEMPLATE_BANK_REPRESENTATION'] = 'compressed'
+        elif isinstance(context.templates, HarmonicTemplateBank):
+            primary.header['HIERARCH SYGN_TEMPLATE_BANK_REPRESENTATION'] = 'harmonic'
+            primary.header['HIERARCH SYGN_TEMPLATE_BANK_TIME_STEPS'] = context.templates.number_of_time_steps
+        else:
+            primary.header['HIERARCH SYGN_TEMPLATE_BANK_REPRESENTATION'] = 'time'
+
+        effective_areas_rms = context.templates.effective_areas_rms.to(u.m ** 2).value.astype(np.float64)
+        indices_x, indices_y = context.templates.indices_x, context.templates.indices_y
+        number_of_outputs, number_of_wavelengths = effective_areas_rms.shape[2:]
+
+        effective_area_hdu = fits.BinTableHDU.from_columns(
+            [fits.Column(name='index_x', array=indices_x.ravel(), format='J'),
+             fits.Column(name='index_y', array=indices_y.ravel(), format='J'),
+             fits.Column(name='effective_area_rms',
+                         array=effective_areas_rms.reshape(-1, number_of_outputs, number_of_wavelengths),
+                         format=f'{number_of_outputs * number_of_wavelengths}D',
+                         dim=f'({number_of_wavelengths},{number_of_outputs})',
+                         unit='m2')],
+            name='EFFECTIVE_AREA_RMS')
+        hdul = fits.HDUList([primary] + FITSWriter._get_template_bank_hdus(context.templates) + [effective_area_hdu])
+        hdul.writeto(output_path.joinpath(f'templates_{datetime.now().strftime("%Y%m%d_%H%M%S.%f")}.fits'))
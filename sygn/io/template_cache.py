@@ -0,0 +1,125 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import astropy
+import numpy as np
+from astropy import units as u
+
+from sygn.core.processing.simulation_plan import SimulationPlan
+
+
+class TemplateCache():
+    """Class representation of the on-disk template cache. Template banks are stored under a key, which is the hash of
+    all quantities the templates depend on, i.e. the instrument configuration, the observation and the planet position
+    grid, but not the noise contributions or the physical parameters of the planet. If the total size of the cache
+    exceeds the maximum size, the least recently used template banks are evicted.
+    """
+
+    _file_suffix = '.npz'
+    _version = 1
+
+    def __init__(self, cache_directory: Path, maximum_size: int = 2 ** 34):
+        """Constructor method.
+
+        :param cache_directory: The directory of the cache, which is created if it does not exist
+        :param maximum_size: The maximum total size of the cached template banks in bytes
+        """
+        self._cache_directory = Path(cache_directory)
+        self._maximum_size = maximum_size
+        os.makedirs(self._cache_directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(plan: SimulationPlan,
+                sky_coordinates_x: np.ndarray,
+                sky_coordinates_y: np.ndarray,
+                planet_spectral_flux_density: np.ndarray) -> str:
+        """Return the key of a template bank. The key is calculated from the unit-free quantities of the simulation plan
+        that enter the template calculation, the sky coordinates of the planet position grid and the wavelengths at
+        which the planet emits, since the templates are undefined at all other wavelengths.
+
+        :param plan: The simulation plan
+        :param sky_coordinates_x: The x-sky coordinates of the planet position grid in radians
+        :param sky_coordinates_y: The y-sky coordinates of the planet position grid in radians
+        :param planet_spectral_flux_density: The planet spectral flux density of shape (wavelengths)
+        :return: The key
+        """
+        hash_object = hashlib.sha256(f'{TemplateCache._version}'.encode())
+        for array in (plan.wavelengths,
+                      plan.wavelength_bin_widths,
+                      np.array([plan.aperture_radius, plan.unperturbed_instrument_throughput, plan.time_step]),
+                      plan.time_range,
+                      plan.beam_combination_matrix,
+                      np.array(plan.differential_output_pairs),
+                      plan.observatory_coordinates.x,
+                      plan.observatory_coordinates.y,
+                      sky_coordinates_x,
+                      sky_coordinates_y,
+                      planet_spectral_flux_density > 0):
+            array = np.ascontiguousarray(array)
+            hash_object.update(f'{array.dtype.str}{array.shape}'.encode())
+            hash_object.update(array.tobytes())
+        return hash_object.hexdigest()
+
+    def _get_path(self, key: str) -> Path:
+        """Return the path of the file of a template bank.
+
+        :param key: The key of the template bank
+        :return: The path
+        """
+        return self._cache_directory.joinpath(f'templates_{key}{self._file_suffix}')
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, astropy.units.Quantity]]:
+        """Return the cached template bank of a key and mark it as recently used, or None if it is not cached.
+
+        :param key: The key of the template bank
+        :return: A tuple containing the differential photon counts and the differential effective areas or None
+        """
+        path = self._get_path(key)
+        try:
+            with np.load(path) as template_bank:
+                differential_photon_counts = template_bank['differential_photon_counts']
+                differential_effective_area = template_bank['differential_effective_area'] * u.m ** 2
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return differential_photon_counts, differential_effective_area
+
+    def store(self,
+              key: str,
+              differential_photon_counts: np.ndarray,
+              differential_effective_area: astropy.units.Quantity):
+        """Store a template bank under a key and evict the least recently used template banks, if the maximum size of
+        the cache is exceeded. The file is written to a temporary path first, such that concurrent runs never read a
+        partially written template bank.
+
+        :param key: The key of the template bank
+        :param differential_photon_counts: The differential photon counts
+        :param differential_effective_area: The differential effective areas
+        """
+        path = self._get_path(key)
+        path_temporary = path.with_name(f'{path.stem}_{os.getpid()}.tmp{self._file_suffix}')
+        np.savez(path_temporary,
+                 differential_photon_counts=differential_photon_counts,
+                 differential_effective_area=differential_effective_area.to(u.m ** 2).value)
+        os.replace(path_temporary, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path):
+        """Delete the least recently used template banks until the total size of the cache does not exceed the maximum
+        size. The template bank that has just been stored is kept in any case.
+
+        :param keep: The path of the template bank that is kept
+        """
+        paths = sorted(self._cache_directory.glob(f'templates_*{self._file_suffix}'),
+                       key=lambda path: path.stat().st_mtime)
+        total_size = sum(path.stat().st_size for path in paths)
+
+        for path in paths:
+            if total_size <= self._maximum_size:
+                break
+            if path == keep or path.name.endswith(f'.tmp{self._file_suffix}'):
+                continue
+            total_size -= path.stat().st_size
+            path.unlink(missing_ok=True)
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from sygn.core.context import Context
+from sygn.core.modules.config_loader_module import ConfigLoaderModule
+from sygn.core.modules.data_generator_module import DataGeneratorModule
+from sygn.core.modules.target_loader_module import TargetLoaderModule
+from sygn.core.modules.template_generator_module import TemplateGeneratorModule
+from sygn.io.config_reader import ConfigReader
+
+PATH_TO_EXAMPLE = Path(__file__).parent.parent / 'examples' / 'single_observation_planetary_system'
+
+
+def get_example_context(local_zodi_leakage: bool = False, exozodi_leakage: bool = False) -> Context:
+    """Return the context of the example planetary system on a coarse grid with few time steps, such that the reference
+    implementations of the tests run quickly. The time range covers a single modulation period of 40 time steps.
+
+    :param local_zodi_leakage: Whether the local zodi leakage should be modeled
+    :param exozodi_leakage: Whether the exozodi leakage should be modeled
+    :return: The context
+    """
+    config_dict = ConfigReader(path_to_config_file=PATH_TO_EXAMPLE / 'config.yaml').get_dictionary_from_file()
+    config_dict['settings']['grid_size'] = 6
+    config_dict['settings']['time_steps'] = 40
+    config_dict['settings']['seed'] = 1
+    config_dict['settings']['noise_contributions']['local_zodi_leakage'] = local_zodi_leakage
+    config_dict['settings']['noise_contributions']['exozodi_leakage'] = exozodi_leakage
+    context_dict = ConfigReader(
+        path_to_config_file=PATH_TO_EXAMPLE / 'planetary_system.yaml').get_dictionary_from_file()
+
+    context = Context()
+    context = ConfigLoaderModule(path_to_config_file=None, config_dict=config_dict).apply(context)
+    context = TargetLoaderModule(path_to_context_file=None, config_dict=context_dict).apply(context)
+    context.observatory.set_optimal_baseline(context.star,
+                                             context.mission.optimized_differential_output,
+                                             context.mission.optimized_wavelength,
+                                             context.mission.optimized_star_separation,
+                                             context.mission.baseline_minimum,
+                                             context.mission.baseline_maximum)
+    return context
+
+
+@pytest.fixture
+def context_with_all_sources() -> Context:
+    """Return the context of the example planetary system including the star, the local zodi and the exozodi.
+
+    :return: The context
+    """
+    return get_example_context(local_zodi_leakage=True, exozodi_leakage=True)
+
+
+@pytest.fixture
+def context_with_templates() -> Context:
+    """Return the context of the example planetary system with a synthetic measurement and the template bank of the
+    planet stored in the time domain.
+
+    :return: The context
+    """
+    context = get_example_context()
+    context = DataGeneratorModule().apply(context)
+    return TemplateGeneratorModule().apply(context)
@@ -0,0 +1,82 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from sygn.core.context import Context
+from sygn.core.processing.data_generation import DataGenerator, GenerationMode
+
+
+def get_mean_photon_counts_per_output_loop(context: Context) -> np.ndarray:
+    """Return the mean photon counts per output calculated by a loop over all times, wavelengths and photon sources,
+    summing the intensity responses over all pixels of the sky brightness distributions as the data generation did
+    before it was vectorized.
+
+    :param context: The context
+    :return: The mean photon counts of shape (outputs, wavelengths, times)
+    """
+    instrument_parameters = context.observatory.instrument_parameters
+    beam_combination_matrix = np.asarray(
+        context.observatory.beam_combination_scheme.get_beam_combination_transfer_matrix(), dtype=complex)
+    observatory_coordinates = context.observatory.array_configuration.get_collector_positions(context.time_range)
+    aperture_radius = instrument_parameters.aperture_radius.to(u.m).value
+    time_step = context.settings.time_step.to(u.s).value
+    mean_photon_counts_per_output = np.zeros((context.observatory.beam_combination_scheme.number_of_outputs,
+                                              len(instrument_parameters.wavelength_bin_centers),
+                                              len(context.time_range)))
+
+    for index_time, index_wavelength, source in product(range(len(context.time_range)),
+                                                        range(len(instrument_parameters.wavelength_bin_centers)),
+                                                        context.photon_sources):
+        index_time_planet_motion = index_time if context.settings.planet_orbital_motion else 0
+        wavelength = instrument_parameters.wavelength_bin_centers[index_wavelength].to(u.m).value
+        sky_coordinates = source.get_sky_coordinates(index_time_planet_motion, index_wavelength)
+        sky_brightness_distribution = np.nan_to_num(
+            source.get_sky_brightness_distribution(index_time_planet_motion, index_wavelength).value.ravel(), nan=0)
+
+        input_complex_amplitudes = aperture_radius * np.exp(1j * 2 * np.pi / wavelength * (
+                np.outer(observatory_coordinates.x[index_time].to(u.m).value,
+                         sky_coordinates.x.to(u.rad).value.ravel()) +
+                np.outer(observatory_coordinates.y[index_time].to(u.m).value,
+                         sky_coordinates.y.to(u.rad).value.ravel())))
+        intensity_responses = abs(beam_combination_matrix @ input_complex_amplitudes) ** 2
+        normalization = max(np.count_nonzero(sky_brightness_distribution > 0), 1)
+
+        mean_photon_counts_per_output[:, index_wavelength, index_time] += (
+                intensity_responses @ sky_brightness_distribution
+                * time_step
+                * instrument_parameters.wavelength_bin_widths[index_wavelength].to(u.um).value
+                * instrument_parameters.unperturbed_instrument_throughput
+                / normalization)
+    return mean_photon_counts_per_output
+
+
+@pytest.mark.parametrize('maximum_chunk_size', [2 ** 22, 2 ** 10])
+def test_mean_photon_counts_match_loop(context_with_all_sources, maximum_chunk_size):
+    """Test that the vectorized data generation yields the same mean photon counts as the loop over all times,
+    wavelengths and photon sources, both if all time steps are processed at once and if they are processed one by one.
+    """
+    data_generator = DataGenerator(context_with_all_sources, GenerationMode.data, maximum_chunk_size=maximum_chunk_size)
+    data_generator.generate_data()
+    mean_photon_counts_per_output = get_mean_photon_counts_per_output_loop(context_with_all_sources)
+
+    np.testing.assert_allclose(data_generator.mean_photon_counts_per_output,
+                               mean_photon_counts_per_output,
+                               rtol=1e-12,
+                               atol=1e-12 * np.max(abs(mean_photon_counts_per_output)))
+
+
+def test_periodic_mean_photon_counts_match_loop(context_with_all_sources):
+    """Test that tiling the simulated modulation period over the time range yields the same mean photon counts as the
+    loop over all times, wavelengths and photon sources.
+    """
+    context_with_all_sources.mission.integration_time *= 2
+    data_generator = DataGenerator(context_with_all_sources, GenerationMode.data, use_periodicity=True)
+    data_generator.generate_data()
+    mean_photon_counts_per_output = get_mean_photon_counts_per_output_loop(context_with_all_sources)
+
+    np.testing.assert_allclose(data_generator.mean_photon_counts_per_output,
+                               mean_photon_counts_per_output,
+                               rtol=1e-12,
+                               atol=1e-12 * np.max(abs(mean_photon_counts_per_output)))
@@ -0,0 +1,203 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from sygn.core.entities.photon_sources.planet import Planet
+from sygn.core.modules.mlm_extraction_module import MLExtractionModule
+from sygn.core.modules.polar_template_generator_module import PolarTemplateGeneratorModule
+from sygn.core.processing.data_generation import DataGenerator, GenerationMode
+from sygn.core.template import CompressedTemplateBank, HarmonicTemplateBank, TemplateBank
+
+
+def calculate_maximum_likelihood_loop(signal: np.ndarray, template_bank: TemplateBank) -> tuple:
+    """Return the cost function and the optimum flux calculated by a loop over all templates and differential outputs,
+    inverting the full matrix B of each template as the extraction did before it was vectorized.
+
+    :param signal: The signal of shape (differential outputs, wavelengths, times)
+    :param template_bank: The template bank
+    :return: The cost function of shape (differential outputs, x, y) and the optimum flux of shape (differential
+        outputs, x, y, wavelengths)
+    """
+    cost_function = np.zeros((len(signal),) + template_bank.shape + (signal.shape[1],))
+    optimum_flux = np.zeros(cost_function.shape)
+    data_variance = np.var(signal, axis=2)
+
+    for index_x, index_y in product(range(template_bank.shape[0]), range(template_bank.shape[1])):
+        template_signal = template_bank[index_x, index_y].signal
+        matrix_c = np.sum(signal * template_signal, axis=2) / data_variance
+        matrix_b_elements = np.sum(template_signal ** 2, axis=2) / data_variance
+
+        for index_output in range(len(signal)):
+            matrix_b = np.diag(matrix_b_elements[index_output])
+            flux = np.diag(np.linalg.inv(matrix_b) * matrix_c[index_output])
+            optimum_flux[index_output, index_x, index_y] = np.where(flux >= 0, flux, 0)
+            cost_function[index_output, index_x, index_y] = (optimum_flux[index_output, index_x, index_y]
+                                                             * matrix_c[index_output])
+
+    cost_function = np.sum(cost_function, axis=3)
+    cost_function[np.isnan(cost_function)] = 0
+    return cost_function, optimum_flux
+
+
+def assert_maximum_likelihood_close(actual: tuple, desired: tuple, rtol: float):
+    """Assert that two pairs of cost functions and optimum fluxes agree up to the relative tolerance, where values that
+    are small compared to the maximum are compared absolutely.
+
+    :param actual: The cost function and the optimum flux
+    :param desired: The desired cost function and optimum flux
+    :param rtol: The relative tolerance
+    """
+    for actual_array, desired_array in zip(actual, desired):
+        np.testing.assert_allclose(actual_array, desired_array, rtol=rtol,
+                                   atol=rtol * np.nanmax(abs(desired_array)))
+
+
+@pytest.mark.parametrize('maximum_memory_size', [None, 2 ** 16])
+def test_maximum_likelihood_matches_loop(context_with_templates, maximum_memory_size):
+    """Test that the vectorized cost function and optimum flux match the loop over all templates and differential
+    outputs, both if all templates are processed at once and if they are processed in chunks.
+    """
+    ml_extraction_module = MLExtractionModule(maximum_memory_size=maximum_memory_size)
+
+    assert_maximum_likelihood_close(
+        ml_extraction_module._calculate_maximum_likelihood(context_with_templates.signal, context_with_templates),
+        calculate_maximum_likelihood_loop(context_with_templates.signal, context_with_templates.templates),
+        rtol=1e-13)
+
+
+def test_harmonic_template_bank_matches_time_domain(context_with_templates):
+    """Test that the extraction with a harmonic template bank storing all frequencies matches the extraction in the time
+    domain.
+    """
+    ml_extraction_module = MLExtractionModule()
+    cost_function_and_optimum_flux = ml_extraction_module._calculate_maximum_likelihood(context_with_templates.signal,
+                                                                                        context_with_templates)
+    number_of_time_steps = context_with_templates.templates.signals.shape[-1]
+    context_with_templates.templates = HarmonicTemplateBank.from_template_bank(context_with_templates.templates,
+                                                                               number_of_time_steps // 2 + 1)
+
+    assert_maximum_likelihood_close(
+        ml_extraction_module._calculate_maximum_likelihood(context_with_templates.signal, context_with_templates),
+        cost_function_and_optimum_flux,
+        rtol=1e-10)
+
+
+def test_compressed_template_bank_matches_time_domain(context_with_templates):
+    """Test that the extraction with a template bank compressed without discarding any energy matches the extraction in
+    the time domain.
+    """
+    ml_extraction_module = MLExtractionModule()
+    cost_function_and_optimum_flux = ml_extraction_module._calculate_maximum_likelihood(context_with_templates.signal,
+                                                                                        context_with_templates)
+    context_with_templates.templates = CompressedTemplateBank.from_template_bank(context_with_templates.templates, 0)
+
+    assert_maximum_likelihood_close(
+        ml_extraction_module._calculate_maximum_likelihood(context_with_templates.signal, context_with_templates),
+        cost_function_and_optimum_flux,
+        rtol=1e-8)
+
+
+def test_polar_template_bank_matches_templates_at_positions(context_with_templates):
+    """Test that the templates of the polar template bank, which are synthesized by time shifts of the templates along
+    the radial cut, match the templates generated directly at the positions of the polar grid, and that the extraction
+    by the circular cross-correlation matches the extraction in the time domain.
+    """
+    context = PolarTemplateGeneratorModule(number_of_azimuths=8).apply(context_with_templates)
+    polar_template_bank = context.templates
+    planet = [source for source in context.photon_sources if isinstance(source, Planet)][0]
+    sky_coordinates = polar_template_bank.get_sky_coordinates()
+    differential_photon_counts, differential_effective_areas = DataGenerator(
+        context,
+        GenerationMode.template).generate_templates_at_positions(planet,
+                                                                 sky_coordinates.x.to(u.rad),
+                                                                 sky_coordinates.y.to(u.rad))
+    template_bank = TemplateBank.from_differential_photon_counts(differential_photon_counts,
+                                                                 differential_effective_areas)
+
+    np.testing.assert_allclose(polar_template_bank.signals, template_bank.signals, rtol=1e-9,
+                               atol=1e-9 * np.nanmax(abs(template_bank.signals)))
+
+    ml_extraction_module = MLExtractionModule()
+    cost_function_and_optimum_flux = ml_extraction_module._calculate_maximum_likelihood(context.signal, context)
+    context.templates = TemplateBank(polar_template_bank.signals, polar_template_bank.effective_areas_rms)
+
+    assert_maximum_likelihood_close(cost_function_and_optimum_flux,
+                                    ml_extraction_module._calculate_maximum_likelihood(context.signal, context),
+                                    rtol=1e-10)
+
+
+def test_batch_extraction_matches_single_extractions(context_with_templates):
+    """Test that the cost functions and optimum fluxes of a stack of signals calculated at once match those of the
+    signals calculated one by one.
+    """
+    random_number_generator = np.random.default_rng(1)
+    signals = context_with_templates.signal + random_number_generator.normal(
+        0,
+        np.std(context_with_templates.signal, axis=2, keepdims=True),
+        (3,) + context_with_templates.signal.shape)
+    ml_extraction_module = MLExtractionModule(maximum_memory_size=2 ** 16)
+    cost_functions, optimum_fluxes = ml_extraction_module._calculate_maximum_likelihood_batch(signals,
+                                                                                              context_with_templates)
+
+    for index_signal, signal in enumerate(signals):
+        assert_maximum_likelihood_close((cost_functions[index_signal], optimum_fluxes[index_signal]),
+                                        ml_extraction_module._calculate_maximum_likelihood(signal,
+                                                                                           context_with_templates),
+                                        rtol=1e-12)
+
+
+@pytest.mark.parametrize('number_of_harmonics', [None, 10])
+def test_online_extraction_matches_batch_extraction(context_with_templates, number_of_harmonics):
+    """Test that the extraction from the signal arriving in time chunks yields the same cost function and spectrum as
+    the extraction from the full signal, both for templates stored in the time domain and in the harmonic domain.
+    """
+    if number_of_harmonics:
+        context_with_templates.templates = HarmonicTemplateBank.from_template_bank(context_with_templates.templates,
+                                                                                   number_of_harmonics)
+    signal = context_with_templates.signal
+    signal_chunks = [(slice(index_start, index_start + 7), signal[..., index_start:index_start + 7]) for index_start
+                     in range(0, signal.shape[-1], 7)]
+    ml_extraction_module = MLExtractionModule(maximum_memory_size=2 ** 16)
+    extraction_online = ml_extraction_module.extract_online(signal_chunks, context_with_templates)
+    extraction_batch = ml_extraction_module.extract_batch(signal[None], context_with_templates)[0]
+
+    np.testing.assert_allclose(extraction_online.cost_function, extraction_batch.cost_function, rtol=1e-10,
+                               atol=1e-10 * np.max(extraction_batch.cost_function))
+    np.testing.assert_allclose(extraction_online.spectrum.value, extraction_batch.spectrum.value, rtol=1e-10,
+                               atol=1e-10 * np.max(extraction_batch.spectrum.value))
+
+
+def test_clean_single_iteration_matches_batch_extraction(context_with_templates):
+    """Test that a single iteration of the iterative extraction with a loop gain of 1 yields the same spectrum and cost
+    function as the extraction of the maximum of the cost function.
+    """
+    extraction_batch = MLExtractionModule().extract_batch(context_with_templates.signal[None],
+                                                          context_with_templates)[0]
+    extractions_clean = MLExtractionModule(significance_threshold=0,
+                                           maximum_number_of_iterations=1)._extract_clean(context_with_templates.signal,
+                                                                                          context_with_templates)
+
+    assert len(extractions_clean) == 1
+    np.testing.assert_allclose(extractions_clean[0].cost_function, extraction_batch.cost_function, rtol=1e-12)
+    np.testing.assert_allclose(extractions_clean[0].spectrum.value, extraction_batch.spectrum.value, rtol=1e-12)
+
+
+def test_clean_recovers_injected_template(context_with_templates):
+    """Test that the iterative extraction of a noiseless signal consisting of a single template recovers the flux of the
+    template at its position and stops once the template has been subtracted.
+    """
+    index_x, index_y = 1, 2
+    template_signal = context_with_templates.templates[index_x, index_y].signal
+    flux = np.linspace(100, 200, template_signal.shape[1])
+    signal = flux[None, :, None] * template_signal
+    extractions = MLExtractionModule(significance_threshold=1)._extract_clean(signal, context_with_templates)
+
+    assert len(extractions) == 1
+    np.testing.assert_allclose(extractions[0].spectrum.value, np.tile(flux, (len(signal), 1)), rtol=1e-10)
+    planet = [source for source in context_with_templates.photon_sources if isinstance(source, Planet)][0]
+    sky_coordinates = planet.get_sky_coordinates(0, 0)
+    np.testing.assert_allclose(extractions[0].position[0].to(u.arcsec).value,
+                               u.Quantity([sky_coordinates.x[index_x, index_y],
+                                           sky_coordinates.y[index_x, index_y]]).to(u.arcsec).value)